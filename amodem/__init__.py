@@ -1,2 +1,11 @@
 import logging
+
 log = logging.getLogger(__name__)
+
+
+def __getattr__(name):
+    # the asyncio API is imported on first use (loading numpy and the modem)
+    if name in ('asend', 'arecv'):
+        from . import aio  # pylint: disable=import-outside-toplevel
+        return getattr(aio, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -2,17 +2,22 @@
 # PYTHON_ARGCOMPLETE_OK
 import argparse
 import contextlib
+import io
 import logging
 import os
 import sys
-import zlib
 
 import pkg_resources
 
 from . import async_reader
 from . import audio
+from . import bench
 from . import calib
+from . import compress
 from . import main
+from . import probe
+from . import wavfile
+from . import config as _config
 from .config import bitrates
 
 
@@ -27,42 +32,8 @@ bitrate = os.environ.get('BITRATE', 1)
 config = bitrates.get(int(bitrate))
 
 
-class Compressor:
-    def __init__(self, stream):
-        self.obj = zlib.compressobj()
-        log.info('Using zlib compressor')
-        self.stream = stream
-
-    def read(self, size):
-        while True:
-            data = self.stream.read(size)
-            if data:
-                result = self.obj.compress(data)
-                if not result:  # compression is too good :)
-                    continue  # try again (since falsy data = EOF)
-            elif self.obj:
-                result = self.obj.flush()
-                self.obj = None
-            else:
-                result = ''  # EOF marker
-            return result
-
-
-class Decompressor:
-    def __init__(self, stream):
-        self.obj = zlib.decompressobj()
-        log.info('Using zlib decompressor')
-        self.stream = stream
-
-    def write(self, data):
-        self.stream.write(self.obj.decompress(bytes(data)))
-
-    def flush(self):
-        self.stream.write(self.obj.flush())
-
-
-def FileType(mode, interface_factory=None):
-    def opener(fname):
+def FileType(mode, interface_factory=None, audio_file=False):
+    def opener(fname, config=None):
         audio_interface = interface_factory() if interface_factory else None
 
         assert 'r' in mode or 'w' in mode
@@ -83,6 +54,11 @@ def FileType(mode, interface_factory=None):
             if 'w' in mode:
                 return sys.stdout.buffer
 
+        if audio_file:  # WAV/FLAC audio files are detected by extension
+            f = wavfile.open_audio(fname, mode, config)
+            if f is not None:
+                return f
+
         return open(fname, mode)  # pylint: disable=unspecified-encoding
 
     return opener
@@ -101,8 +77,21 @@ def get_volume_cmd(args):
     return None
 
 
-def wrap(cls, stream, enable):
-    return cls(stream) if enable else stream
+def _codec(args):
+    return args.codec or ('zlib' if args.zlib else None)
+
+
+def _compressor(args):
+    codec = _codec(args)
+    if codec is None:
+        return args.src
+    return compress.Compressor(args.src, codec=codec, level=args.level)
+
+
+def _decompressor(args):
+    if args.decompress or args.zlib:
+        return compress.Decompressor(args.dst)  # codec is detected in-band
+    return args.dst
 
 
 def create_parser(description, interface_factory):
@@ -118,23 +107,40 @@ def create_parser(description, interface_factory):
         '-o', '--output', help='output file (use "-" for stdout).'
         ' if not specified, `aplay` tool will be used.')
     sender.add_argument(
-        '-g', '--gain', type=float, default=1.0,
-        help='Modulator gain (defaults to 1)')
+        '-g', '--gain', type=float, default=None,
+        help='Modulator gain (defaults to the profile gain, usually 1)')
     sender.add_argument(
         '--silence', type=float, default=0.0,
         help='Extra silence before sending the data (in seconds)')
+    sender.add_argument(
+        '--stream', action='store_true', default=False,
+        help='send the input as soon as it arrives (keeping the carrier up '
+        'while it is idle), until it is closed')
+    sender.add_argument(
+        '--codec', choices=sorted(compress.codecs),
+        help='Compress data using this codec '
+        '(the receiver detects it automatically).')
+    sender.add_argument(
+        '--level', type=int, default=None,
+        help='Compression level (codec-specific).')
     sender.set_defaults(
         main=lambda config, args: main.send(
-            config, src=wrap(Compressor, args.src, args.zlib), dst=args.dst,
-            gain=args.gain, extra_silence=args.silence
+            config, src=_compressor(args), dst=args.dst,
+            gain=args.gain, extra_silence=args.silence,
+            streaming=args.stream
         ),
-        calib=lambda config, args: calib.send(
+        calib=lambda config, args: (
+            calib.send_multitone if args.multitone else calib.send)(
             config=config, dst=args.dst,
             volume_cmd=get_volume_cmd(args),
-            gain=args.gain,
+            gain=config.gain if args.gain is None else args.gain,
+        ),
+        run_probe=lambda config, args: main.send(
+            config, src=io.BytesIO(), dst=args.dst,
+            gain=args.gain, extra_silence=args.silence
         ),
         input_type=FileType('rb'),
-        output_type=FileType('wb', interface_factory),
+        output_type=FileType('wb', interface_factory, audio_file=True),
         command='send'
     )
 
@@ -151,34 +157,95 @@ def create_parser(description, interface_factory):
     receiver.add_argument(
         '--plot', action='store_true', default=False,
         help='plot results using pylab module')
+    receiver.add_argument(
+        '--pipeline', action='store_true', default=False,
+        help='demodulate using separate (demux and decode) threads')
+    receiver.add_argument(
+        '--decompress', default=False, action='store_true',
+        help='Decompress data (detecting the codec used by the sender).')
     receiver.set_defaults(
         main=lambda config, args: main.recv(
-            config, src=args.src, dst=wrap(Decompressor, args.dst, args.zlib),
-            pylab=args.pylab, dump_audio=args.dump
+            config, src=args.src, dst=_decompressor(args),
+            pylab=args.pylab, dump_audio=args.dump, pipeline=args.pipeline
         ),
-        calib=lambda config, args: calib.recv(
+        calib=lambda config, args: calib.recv_multitone(
+            config=config, src=args.src, dst=args.dst
+        ) if args.multitone else calib.recv(
             config=config, src=args.src, verbose=args.verbose,
             volume_cmd=get_volume_cmd(args)
         ),
-        input_type=FileType('rb', interface_factory),
+        run_probe=lambda config, args: probe.report(main.probe(
+            config, src=args.src, pylab=args.pylab, dump_audio=args.dump
+        )),
+        input_type=FileType('rb', interface_factory, audio_file=True),
         output_type=FileType('wb'),
         command='recv'
     )
 
     calibration_help = ('Run calibration '
                         '(specify "auto" for automatic gain control)')
+    probe_help = ('Probe the channel using a short training burst '
+                  '(the receiver recommends the fastest reliable bitrate)')
+    multitone_help = ('Calibrate all the carriers at once (the receiver '
+                      'writes the channel response as JSON)')
 
     for sub in subparsers.choices.values():
         sub.add_argument('-c', '--calibrate', nargs='?', default=False,
                          metavar='SYSTEM', help=calibration_help)
+        sub.add_argument('--probe', default=False, action='store_true',
+                         help=probe_help)
+        sub.add_argument('--multitone', default=False, action='store_true',
+                         help=multitone_help)
+        sub.add_argument('-p', '--profile', default=None,
+                         help='Load MODEM configuration from a JSON/TOML '
+                         'profile file (instead of BITRATE).')
         sub.add_argument('-l', '--audio-library', default='libportaudio.so',
                          help='File name of PortAudio shared library.')
+        sub.add_argument('--buffer-size', type=int, default=None,
+                         metavar='FRAMES',
+                         help='ALSA buffer size (defaults to 0.5 seconds).')
+        sub.add_argument('--period-size', type=int, default=None,
+                         metavar='FRAMES',
+                         help='ALSA period size (defaults to 1/4 buffer).')
         sub.add_argument('-z', '--zlib', default=False, action='store_true',
                          help='Use zlib to compress/decompress data.')
         g = sub.add_mutually_exclusive_group()
         g.add_argument('-v', '--verbose', default=0, action='count')
         g.add_argument('-q', '--quiet', default=False, action='store_true')
 
+    # Benchmark (using a simulated channel, without audio devices)
+    bench_ber = subparsers.add_parser(
+        'bench-ber', help='measure error rates and goodput vs. SNR.')
+    bench_ber.add_argument(
+        '-b', '--bitrates', type=int, nargs='+', default=sorted(bitrates),
+        choices=sorted(bitrates), metavar='BITRATE',
+        help='MODEM bitrates to measure (defaults to all of them)')
+    bench_ber.add_argument(
+        '--snr', type=float, nargs='+', default=[10, 15, 20, 25, 30, 35, 40],
+        help='channel SNR values [dB], relative to the data signal power')
+    bench_ber.add_argument(
+        '--drift', type=float, nargs='+', default=[0.0],
+        help='sampling clock drift values [ppm]')
+    bench_ber.add_argument(
+        '-s', '--size', type=int, default=2000,
+        help='payload size (in bytes)')
+    bench_ber.add_argument(
+        '-n', '--trials', type=int, default=1,
+        help='number of transfers per measurement')
+    bench_ber.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='number of worker processes (defaults to the number of CPUs)')
+    bench_ber.add_argument('--seed', type=int, default=0)
+    bench_ber.add_argument(
+        '-f', '--format', choices=bench.formats, default='csv')
+    bench_ber.add_argument(
+        '-o', '--output', type=argparse.FileType('w'), default='-',
+        help='output file (use "-" for stdout).')
+    g = bench_ber.add_mutually_exclusive_group()
+    g.add_argument('-v', '--verbose', default=0, action='count')
+    g.add_argument('-q', '--quiet', default=False, action='store_true')
+    bench_ber.set_defaults(command='bench-ber')
+
     if argcomplete:
         argcomplete.autocomplete(p)
 
@@ -205,25 +272,48 @@ def _config_log(args):
     logging.basicConfig(level=level, format=fmt)
 
 
-def _main():
+def _describe(config):
     fmt = ('Audio OFDM MODEM v{0:s}: '
-           '{1:.1f} kb/s ({2:d}-QAM x {3:d} carriers) '
+           '{1:.1f} kb/s ({2:s}-QAM x {3:d} carriers) '
            'Fs={4:.1f} kHz')
-    description = fmt.format(_version(),
-                             config.modem_bps / 1e3, len(config.symbols),
-                             config.Nfreq, config.Fs / 1e3)
+    sizes = sorted(set(len(c) for c in config.constellations), reverse=True)
+    return fmt.format(_version(),
+                      config.modem_bps / 1e3, '/'.join(map(str, sizes)),
+                      config.Nfreq, config.Fs / 1e3)
+
+
+def _validate_args(p, args):
+    codec = _codec(args) if args.command == 'send' else None
+    if codec is None:
+        return
+    if args.stream:
+        # the compressors buffer their input (delaying the streamed data)
+        p.error('--stream cannot be used with compression')
+    try:
+        compress.check_level(codec, args.level)
+    except ValueError as e:
+        p.error(str(e))
+
+
+def _main():
     interface = None
 
     def interface_factory():
         return interface
 
-    p = create_parser(description, interface_factory)
+    p = create_parser(_describe(config), interface_factory)
 
     args = p.parse_args()
+    _validate_args(p, args)
     _config_log(args)
+    if args.command == 'bench-ber':
+        bench.cli(args)
+        return
 
     # Parsing and execution
-    log.info(description)
+    cfg = _config.load(args.profile) if args.profile else config
+    cfg = probe.config if args.probe else cfg
+    log.info(_describe(cfg))
 
     args.pylab = None
     if getattr(args, 'plot', False):
@@ -232,7 +322,8 @@ def _main():
 
     if args.audio_library == 'ALSA':
         from . import alsa  # pylint: disable=import-outside-toplevel
-        interface = alsa.Interface(config)
+        interface = alsa.Interface(cfg, period_size=args.period_size,
+                                   buffer_size=args.buffer_size)
     elif args.audio_library == '-':
         interface = contextlib.nullcontext()  # manually disable PortAudio
     elif args.command == 'send' and args.output is not None:
@@ -240,17 +331,22 @@ def _main():
     elif args.command == 'recv' and args.input is not None:
         interface = contextlib.nullcontext()  # redirected input
     else:
-        interface = audio.Interface(config)
+        interface = audio.Interface(cfg)
         interface.load(args.audio_library)
 
     with interface:
-        args.src = args.input_type(args.input)
-        args.dst = args.output_type(args.output)
+        args.src = args.input_type(args.input, cfg)
+        args.dst = args.output_type(args.output, cfg)
+        if getattr(args.src, 'config', cfg) is not cfg:  # from audio file
+            cfg = args.src.config
+            log.info(_describe(cfg))
         try:
-            if args.calibrate is False:
-                args.main(config=config, args=args)
+            if args.calibrate is not False:
+                args.calib(config=cfg, args=args)
+            elif args.probe:
+                args.run_probe(config=cfg, args=args)
             else:
-                args.calib(config=config, args=args)
+                args.main(config=cfg, args=args)
         finally:
             args.src.close()
             args.dst.close()
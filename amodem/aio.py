@@ -0,0 +1,154 @@
+"""Asyncio API for amodem.
+
+The modem runs in the event loop's thread: audio is read (or written)
+asynchronously, and the processing steps run only when their input is
+already buffered, so many sessions can share a single event loop.
+"""
+
+import collections
+import io
+import logging
+
+from . import common, detect, framing, main, sampling
+from . import recv as _recv
+from . import send as _send
+
+log = logging.getLogger(__name__)
+
+
+class _Source:
+    """ Iterate over the audio samples buffered from an asyncio stream. """
+
+    bufsize = 8 << 10
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.chunks = collections.deque()
+        self.current = iter(())
+        self.size = 0  # number of buffered samples
+        self.eof = False
+        self.partial = b''  # incomplete sample data
+
+    async def fill(self, size):
+        """ Buffer at least `size` samples (unless the stream has ended). """
+        while self.size < size and not self.eof:
+            data = await self.reader.read(self.bufsize)
+            if not data:
+                self.eof = True
+                break
+            data = self.partial + data
+            end = len(data) - len(data) % 2  # 16-bit samples
+            self.partial = data[end:]
+            samples = common.loads(data[:end])
+            self.chunks.append(samples)
+            self.size += len(samples)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            try:
+                sample = next(self.current)
+                self.size -= 1
+                return sample
+            except StopIteration:
+                if self.chunks:
+                    self.current = iter(self.chunks.popleft())
+                elif self.eof:
+                    raise
+                else:  # the processing step was not given enough samples
+                    raise RuntimeError('missing buffered audio') from None
+
+
+async def _write(sender, writer):
+    sender.flush()
+    audio = sender.fd
+    writer.write(audio.getvalue())
+    audio.seek(0)
+    audio.truncate()
+    await writer.drain()
+
+
+async def _read_block(reader, size):
+    block = bytearray()
+    while len(block) < size:
+        data = await reader.read(size - len(block))
+        if not data:
+            break
+        block.extend(data)
+    return block
+
+
+async def asend(config, reader, writer, gain=None, extra_silence=0.0):
+    """ Modulate the data from an asyncio stream `reader` into `writer`.
+    The resulting audio is the same as the one written by `main.send()`.
+    """
+    gain = config.gain if gain is None else gain
+    sender = _send.Sender(io.BytesIO(), config=config, gain=gain)
+    steps = main.send_blocks(config, sender, extra_silence)
+    next(steps)  # the training
+    await _write(sender, writer)
+
+    size = framing.Framer.block_size
+    while True:
+        block = await _read_block(reader, size)
+        steps.send(block)
+        await _write(sender, writer)
+        if len(block) < size:  # the last block
+            return True
+
+
+async def arecv(config, reader, pylab=None):
+    """ Demodulate the audio from an asyncio stream `reader`,
+    asynchronously yielding the received data chunks.
+    """
+    pylab = pylab or common.Dummy()
+    receiver = _recv.Receiver(config=config, pylab=pylab)
+    source = _Source(reader)
+    try:
+        sampler, gain = await _detect(config, source, pylab)
+
+        # processing steps may consume up to 10% more samples (due to drift)
+        margin = 2 * sampling.defaultInterpolator.width + config.Nsym
+
+        def required(symbols):
+            return int(1.1 * symbols * config.Nsym) + margin
+
+        await source.fill(required(receiver.start_symbols))
+        symbols = receiver.start(sampler, gain=gain)
+
+        bitstream = receiver.bitstream(sampler, symbols)
+        decoder = framing.FrameDecoder()
+        while not decoder.eof:
+            await source.fill(required(receiver.block_size))
+            bits = next(bitstream, None)
+            if bits is None:
+                raise ValueError('missing frame data')
+            for frame in decoder.feed(bits):
+                receiver.output_size += len(frame)
+                yield frame
+    finally:
+        receiver.report()
+
+
+async def _detect(config, source, pylab):
+    skip = int(config.skip_start * config.Fs)
+    log.debug('Skipping %.3f seconds', config.skip_start)
+    await source.fill(skip)
+    common.take(source, skip)
+
+    detector = detect.Detector(config=config, pylab=pylab)
+    log.info('Waiting for carrier tone: %.1f kHz', config.Fc / 1e3)
+    waiter = detector.waiter()
+    next(waiter)
+    while True:
+        await source.fill(config.Nsym)
+        if source.size < config.Nsym:
+            raise ValueError('No carrier detected')
+        try:
+            waiter.send(common.take(source, config.Nsym))
+        except StopIteration as e:
+            offset, bufs = e.value
+            await source.fill(detector.trailing_size)
+            return main.compensate(*detector.locate(offset, bufs, source))
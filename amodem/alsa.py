@@ -3,8 +3,10 @@ recording and playing.
 
 """
 
-import subprocess
 import logging
+import queue
+import subprocess
+import threading
 
 log = logging.getLogger(__name__)
 
@@ -13,15 +15,26 @@ class Interface:
 
     RECORDER = 'arecord'
     PLAYER = 'aplay'
+    buffer_time = 0.5  # [seconds], as the tools' default
 
-    def __init__(self, config):
+    def __init__(self, config, period_size=None, buffer_size=None):
         self.config = config
         rate = int(config.Fs)
         bits_per_sample = config.bits_per_sample
         assert bits_per_sample == 16
 
-        args = '-f S{0:d}_LE -c 1 -r {1:d} -T 100 -q -'
-        args = args.format(bits_per_sample, rate).split()
+        # ALSA ring buffer [frames]
+        self.buffer_size = buffer_size or int(self.buffer_time * config.Fs)
+        self.period_size = period_size or max(self.buffer_size // 4, 1)
+        assert 0 < self.period_size <= self.buffer_size
+        # the audio is passed in chunks of the configured latency [bytes]
+        chunk_frames = min(int(config.latency * config.Fs), self.buffer_size)
+        self.chunk_size = chunk_frames * config.sample_size
+
+        args = (f'-f S{bits_per_sample:d}_LE -c 1 -r {rate:d} -T 100 '
+                f'--period-size={self.period_size:d} '
+                f'--buffer-size={self.buffer_size:d} -q -')
+        args = args.split()
 
         self.record_cmd = [self.RECORDER] + args
         self.play_cmd = [self.PLAYER] + args
@@ -50,21 +63,112 @@ class Interface:
         return Player(self)
 
 
+class Monitor:
+    """ Log the error messages of an ALSA tool (using a separate thread),
+    counting its reported xruns (e.g. "underrun!!! (at least 5.123 ms long)").
+    """
+
+    def __init__(self, fd, name):
+        self.name = name
+        self.xruns = 0
+        self.thread = threading.Thread(target=self._thread, args=(fd,),
+                                       name=name, daemon=True)
+        self.thread.start()
+
+    def _thread(self, fd):
+        for line in iter(fd.readline, b''):
+            line = line.decode(errors='replace').strip()
+            if 'underrun' in line or 'overrun' in line:
+                self.xruns += 1
+                log.warning('%s: %s', self.name, line)
+            elif line:
+                log.debug('%s: %s', self.name, line)
+
+    def join(self, timeout=1.0):
+        self.thread.join(timeout)
+        if self.xruns:
+            log.warning('%s: %d xruns', self.name, self.xruns)
+
+
 class Recorder:
     def __init__(self, lib):
-        self.p = lib.launch(args=lib.record_cmd, stdout=subprocess.PIPE)
-        self.read = self.p.stdout.read
-        self.bufsize = 4096
+        self.p = lib.launch(args=lib.record_cmd, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+        self.monitor = Monitor(self.p.stderr, name=lib.RECORDER)
+        self.bufsize = lib.chunk_size
+        self.buf = bytearray(self.bufsize)  # reused by `read()`
+
+    def readinto(self, buf):
+        return self.p.stdout.readinto(buf)
+
+    def read(self, size):
+        """ Read using the preallocated buffer. """
+        if size > len(self.buf):
+            self.buf = bytearray(size)
+        view = memoryview(self.buf)[:size]
+        n = self.readinto(view)
+        return bytes(view[:n])
+
+    @property
+    def xruns(self):
+        return self.monitor.xruns
 
     def close(self):
         self.p.kill()
+        self.monitor.join()
 
 
 class Player:
+    """ Batch the written audio into large chunks, which are written
+    by a separate thread (so the caller doesn't block on each write). """
+
+    queue_size = 4  # [chunks]
+
     def __init__(self, lib):
-        self.p = lib.launch(args=lib.play_cmd, stdin=subprocess.PIPE)
-        self.write = self.p.stdin.write
+        self.p = lib.launch(args=lib.play_cmd, stdin=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+        self.monitor = Monitor(self.p.stderr, name=lib.PLAYER)
+        self.chunk_size = lib.chunk_size
+        self.buffer = bytearray()
+        self.chunks = queue.Queue(self.queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._thread, name='Player',
+                                       daemon=True)
+        self.thread.start()
+
+    def _thread(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                return
+            if self.error is None:  # keep draining the queue after errors
+                try:
+                    self.p.stdin.write(chunk)
+                except BaseException as e:  # pylint: disable=broad-except
+                    self.error = e
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def write(self, data):
+        self._check()
+        self.buffer.extend(data)
+        if len(self.buffer) >= self.chunk_size:
+            self.chunks.put(self.buffer)
+            self.buffer = bytearray()
+
+    @property
+    def xruns(self):
+        return self.monitor.xruns
 
     def close(self):
+        if self.buffer:
+            self.chunks.put(self.buffer)
+            self.buffer = bytearray()
+        self.chunks.put(None)
+        self.thread.join()
         self.p.stdin.close()
         self.p.wait()
+        self.monitor.join()
+        self._check()
@@ -17,15 +17,16 @@ class AsyncReader:
         self.thread = threading.Thread(target=AsyncReader._thread,
                                        args=args, name='AsyncReader')
         self.thread.start()
-        self.buf = b''
+        self.buf = bytearray()
 
     @staticmethod
     def _thread(src, bufsize, queue, stop):
         total = 0
         try:
             log.debug('AsyncReader thread started')
+            read = AsyncReader._reader(src, bufsize)
             while not stop.isSet():
-                buf = src.read(bufsize)
+                buf = read()
                 queue.put(buf)
                 total += len(buf)
             log.debug('AsyncReader thread stopped (read %d bytes)', total)
@@ -33,15 +34,24 @@ class AsyncReader:
             log.exception('AsyncReader thread failed')
             queue.put(None)
 
+    @staticmethod
+    def _reader(src, bufsize):
+        """ Read into a preallocated buffer, if supported by `src`. """
+        readinto = getattr(src, 'readinto', None)
+        if readinto is None:
+            return lambda: src.read(bufsize)
+        view = memoryview(bytearray(bufsize))
+        return lambda: bytes(view[:readinto(view)])
+
     def read(self, size):
         while len(self.buf) < size:
             buf = self.queue.get()
             if buf is None:
                 raise IOError('cannot read from stream')
-            self.buf += buf
+            self.buf.extend(buf)
 
-        result = self.buf[:size]
-        self.buf = self.buf[size:]
+        result = bytes(self.buf[:size])
+        del self.buf[:size]  # without reallocating the remaining data
         return result
 
     def close(self):
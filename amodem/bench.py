@@ -0,0 +1,151 @@
+"""Error rate and goodput benchmark for amodem (`amodem bench-ber`).
+
+Each MODEM profile sends a random payload through a simulated channel
+(with sampling drift and noise), using the full send and receive path of
+`main.Session`. The measurements run in worker processes.
+"""
+
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+from io import BytesIO
+
+import numpy as np
+
+from . import channel, common, config, framing, main, send, stream
+
+log = logging.getLogger(__name__)
+
+fields = ['bitrate', 'snr', 'drift', 'trials', 'ser', 'fer', 'goodput']
+formats = ('csv', 'json')
+
+
+def data_power(session, signal):
+    """ Mean power of the modulated data in the transmitted signal (i.e.
+    without the pilot prefix and the training, which are louder). """
+    cfg = session.config
+    preamble = send.preamble(cfg, session.gain)
+    start = int(cfg.Fs * cfg.silence_start) + len(preamble) // cfg.sample_size
+    stop = len(signal) - int(cfg.Fs * cfg.silence_stop)
+    return channel.signal_power(signal[start:stop])
+
+
+def transmit(session, data, snr, seed, impairments=()):
+    """ Send the data through the simulated channel (the impairments,
+    followed by noise at `snr` [dB] relative to the data power), returning
+    the transmitted and the received audio. """
+    tx_audio = BytesIO()
+    session.send(src=BytesIO(data), dst=tx_audio)
+    signal = common.loads(tx_audio.getvalue())
+
+    noise = channel.Noise(snr=snr, power=data_power(session, signal),
+                          seed=seed)
+    chan = channel.Channel(*impairments, noise)
+    # the receiver keeps recording after the transmission has ended
+    recording = np.concatenate([signal, np.zeros(stream.Reader.bufsize)])
+    return signal, BytesIO(common.dumps(chan.apply(recording)))
+
+
+def _receive(session, rx_audio):
+    """ Return the received payload size and frames (including EOF). """
+    size = frames = 0
+    try:
+        for data, _ in session.recv_iter(rx_audio):
+            size += len(data)
+            frames += 1
+        frames += 1  # EOF frame
+    except (ValueError, AssertionError, IOError) as e:
+        log.debug('Receiving failed: %s', e)  # the following frames are lost
+    return size, frames
+
+
+def _symbol_errors(session, data):
+    """ Compare the demodulated symbols (until the receiving has stopped)
+    with the transmitted ones, returning the errors and compared symbols.
+    """
+    sender = session.sender
+    bits = itertools.chain(framing.encode(data), sender.padding)
+    expected = np.array(list(sender.encode(bits)))
+    stats = session.receiver.stats if session.receiver else {}
+    if not stats.get('symbol_list'):  # not detected (or trained)
+        return expected.size, expected.size
+
+    received = np.concatenate(stats['symbol_list'])[:len(expected)]
+    decoded = np.concatenate([modem.decode_block(received[:, [i]])[0]
+                              for i, modem in enumerate(sender.modems)],
+                             axis=1)
+    errors = np.sum(decoded != expected[:len(decoded)])
+    return int(errors), decoded.size
+
+
+def measure(bitrate, snr, drift, size, seed):
+    """ Send a single payload through the simulated channel.
+    Returns the symbol errors, demodulated symbols, frame errors, frames,
+    received payload bytes, and transmission duration [seconds].
+    """
+    cfg = config.bitrates[bitrate]
+    data = np.random.RandomState(seed).bytes(size)
+    session = main.Session(cfg, gain=0.5)
+    signal, rx_audio = transmit(session, data, snr, seed,
+                                [channel.Drift(ppm=drift)])
+    received, received_frames = _receive(session, rx_audio)
+    frames = -(-size // framing.Framer.block_size) + 1  # including EOF
+    symbol_errors, symbols = _symbol_errors(session, data)
+    return (symbol_errors, symbols, frames - received_frames, frames,
+            received, len(signal) / cfg.Fs)
+
+
+def _measure(args):
+    return measure(*args)
+
+
+def _row(point, results):
+    bitrate, snr, drift = point
+    symbol_errors, symbols, frame_errors, frames, received, duration = \
+        np.sum(results, axis=0)
+    return {
+        'bitrate': bitrate, 'snr': snr, 'drift': drift,
+        'trials': len(results), 'ser': symbol_errors / symbols,
+        'fer': frame_errors / frames, 'goodput': received / duration,
+    }
+
+
+def run(points, size=2000, trials=1, jobs=None, seed=0):
+    """ Measure each (bitrate, SNR [dB], drift [ppm]) point (the SNR is
+    relative to the data power, see `data_power()`), returning
+    a row (dict) per point, with the symbol and frame error rates, and the
+    goodput [bytes/second] (including the preamble overhead). """
+    points = list(points)
+    tasks = [(bitrate, snr, drift, size, seed + trial)
+             for bitrate, snr, drift in points for trial in range(trials)]
+    if jobs == 1:
+        results = list(map(_measure, tasks))
+    else:
+        with multiprocessing.Pool(jobs) as pool:
+            results = pool.map(_measure, tasks)
+    return [_row(point, results[i * trials:(i + 1) * trials])
+            for i, point in enumerate(points)]
+
+
+def write(rows, fd, fmt='csv'):
+    """ Write the result rows as CSV (or JSON) into a text file. """
+    if fmt == 'json':
+        json.dump(rows, fd, indent=2)
+        fd.write('\n')
+    else:
+        writer = csv.DictWriter(fd, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def cli(args):
+    """ Run the benchmark, as specified by the command-line arguments. """
+    log.info('Measuring %d points (%d trials each)',
+             len(args.bitrates) * len(args.snr) * len(args.drift),
+             args.trials)
+    points = itertools.product(args.bitrates, args.snr, args.drift)
+    rows = run(points, size=args.size, trials=args.trials, jobs=args.jobs,
+               seed=args.seed)
+    write(rows, args.output, fmt=args.format)
@@ -1,6 +1,7 @@
 """Calibration capabilities for amodem."""
 
 import itertools
+import json
 import logging
 import subprocess
 
@@ -8,7 +9,7 @@ import numpy as np
 
 from . import common
 from . import dsp
-from . import sampling
+from . import probe
 from . import stream
 
 log = logging.getLogger(__name__)
@@ -24,22 +25,48 @@ def volume_controller(cmd):
     return controller if cmd else (lambda level: None)
 
 
-def send(config, dst, volume_cmd=None, gain=1.0, limit=None):
+def multitone_signal(config, gain=1.0):
+    """ A single symbol exciting all the carriers at once (using Schroeder
+    phases, for a low crest factor), with `gain` peak amplitude.
+    Returns the signal and the carriers' symbols. """
+    k = np.arange(config.Nfreq)
+    symbols = np.exp(-1j * np.pi * k * (k + 1) / config.Nfreq)
+    omegas = 2 * np.pi * np.array(config.frequencies) / config.Fs
+    signal = dsp.Modulator(omegas, config.Nsym)(symbols)
+    scale = gain / np.max(np.abs(signal))
+    return signal * scale, symbols * scale
+
+
+def _send(signals, dst, volume_cmd, limit):
     volume_ctl = volume_controller(volume_cmd)
     volume_ctl(1.0)  # full scale output volume
 
+    signals = [common.dumps(s) for s in signals]
+    for signal in itertools.islice(itertools.cycle(signals), limit):
+        dst.write(signal)
+
+
+def send(config, dst, volume_cmd=None, gain=1.0, limit=None):
     calibration_symbols = int(1.0 * config.Fs)
     t = np.arange(0, calibration_symbols) * config.Ts
     signals = [gain * np.sin(2 * np.pi * f * t) for f in config.frequencies]
-    signals = [common.dumps(s) for s in signals]
+    _send(signals, dst, volume_cmd, limit)
 
-    for signal in itertools.islice(itertools.cycle(signals), limit):
-        dst.write(signal)
 
+def send_multitone(config, dst, volume_cmd=None, gain=1.0, limit=None):
+    """ Send all the carriers at once (see `multitone_signal()`). """
+    signal, _ = multitone_signal(config, gain)
+    repeats = int(1.0 * config.Fs) // config.Nsym  # a second per signal
+    _send([np.tile(signal, repeats)], dst, volume_cmd, limit)
 
-def frame_iter(config, src, frame_length):
+
+def _frames(config, src, frame_length):
+    """ Read frames of `frame_length` symbols, demultiplexing each one.
+    Yields the frame (without its DC), and its symbols (a row per symbol).
+    """
     frame_size = frame_length * config.Nsym * config.sample_size
     omegas = 2 * np.pi * np.array(config.frequencies) / config.Fs
+    filters = dsp.demux_filters(omegas, config.Nsym)
 
     while True:
         data = src.read(frame_size)
@@ -47,19 +74,24 @@ def frame_iter(config, src, frame_length):
             return
         data = common.loads(data)
         frame = data - np.mean(data)
+        yield frame, dsp.demux_block(frame, omegas, config.Nsym, filters)
 
-        sampler = sampling.Sampler(frame)
-        symbols = dsp.Demux(sampler, omegas, config.Nsym)
 
-        symbols = np.array(list(symbols))
-        coeffs = np.mean(np.abs(symbols) ** 2, axis=0) ** 0.5
+def _levels(frame):
+    """ Return the peak and the total (RMS-based) level of a frame. """
+    peak = np.max(np.abs(frame))
+    total = np.sqrt(np.dot(frame, frame) / (0.5 * len(frame)))
+    return peak, total
+
 
-        peak = np.max(np.abs(frame))
-        total = np.sqrt(np.dot(frame, frame) / (0.5 * len(frame)))
+def frame_iter(config, src, frame_length):
+    for frame, symbols in _frames(config, src, frame_length):
+        coeffs = np.mean(np.abs(symbols) ** 2, axis=0) ** 0.5
+        peak, total = _levels(frame)
         yield coeffs, peak, total
 
 
-def detector(config, src, frame_length=200):
+def detector(config, src, frame_length=50):
 
     errors = ['weak', 'strong', 'noisy']
     for coeffs, peak, total in frame_iter(config, src, frame_length):
@@ -81,22 +113,114 @@ def detector(config, src, frame_length=200):
         }
 
 
-def volume_calibration(result_iterator, volume_ctl):
+def channel_response(config, symbols, sent):
+    """ Estimate each carrier's gain, SNR [dB] and phase [radians], and
+    the sampling drift [ppm], from the received multitone `symbols` (a row
+    per symbol), compared with the `sent` symbols.
+    The phases are relative to the best-fitting delay (which is unknown).
+    """
+    omegas = 2 * np.pi * np.array(config.frequencies) / config.Fs
+    # the sampling drift rotates each carrier at a constant rate
+    rotation = np.angle(np.sum(symbols[1:] * symbols[:-1].conj(), axis=0))
+    index = np.arange(len(symbols))[:, None]
+    symbols = symbols * np.exp(-1j * rotation * index)
+    drift = np.dot(omegas, rotation) / np.dot(omegas, omegas) / config.Nsym
+
+    mean = np.mean(symbols, axis=0)
+    noise = np.mean(np.abs(symbols - mean) ** 2, axis=0)
+    response = mean / sent
+
+    # find the delay (within a symbol) which aligns the carriers' phases
+    delays = np.arange(0, config.Nsym, 1.0 / 16)
+    aligned = np.abs(np.dot(np.exp(1j * np.outer(delays, omegas)), response))
+    response = response * np.exp(1j * omegas * delays[np.argmax(aligned)])
+    response = response * np.exp(-1j * np.angle(np.sum(response)))
+    return {
+        'gain': np.abs(response),
+        'snr': 10 * np.log10(np.abs(mean) ** 2 / noise),
+        'phase': np.angle(response),
+        'drift': drift * 1e6,
+    }
+
+
+def channel_profile(config, response):
+    """ Summarize the channel response as a JSON-serializable dict,
+    including the recommended bitrate, and a bit-loaded profile (which
+    can be loaded using `--profile`), if the channel supports them.
+    """
+    freqs = [float(f) for f in config.frequencies]
+    snr = dict(zip(freqs, response['snr']))
+    loaded = probe.bit_loading(snr, cfg=config)
+    profile = None
+    if loaded is not None:
+        profile = {'Fs': config.Fs, 'Tsym': config.Tsym,
+                   'carriers': [float(f) for f in loaded.frequencies],
+                   'Npoints': [len(c) for c in loaded.constellations]}
+    carriers = [
+        {'freq': f, 'gain': float(g), 'snr': float(s), 'phase': float(p)}
+        for f, g, s, p in zip(freqs, response['gain'], response['snr'],
+                              response['phase'])
+    ]
+    return {
+        'Fs': config.Fs, 'Tsym': config.Tsym,
+        'drift': float(response['drift']), 'carriers': carriers,
+        'bitrate': probe.recommend(snr), 'profile': profile,
+    }
+
+
+def recv_multitone(config, src, dst=None, duration=1.0, frame_length=250):
+    """ Measure the channel response using the multitone calibration
+    signal, returning its profile (see `channel_profile()`) and writing it
+    into `dst` as JSON. The response is estimated from `duration` seconds
+    of consecutive good frames (after the first one, during which the
+    signal may have started). Returns None if the signal is not received.
+    """
+    _, sent = multitone_signal(config)
+    frames_count = int(round(duration * config.baud / frame_length))
+    good = []
+    for frame, symbols in _frames(config, src, frame_length):
+        peak, total = _levels(frame)
+        if total <= 0.1 or peak >= 1.0:
+            log.info('too %s signal', 'weak' if total <= 0.1 else 'strong')
+            good = []
+            continue
+        good.append(symbols)
+        if len(good) <= frames_count:
+            continue
+
+        response = channel_response(config, np.concatenate(good[1:]), sent)
+        profile = channel_profile(config, response)
+        for carrier in profile['carriers']:
+            log.info('%(freq)6.0f Hz: gain=%(gain).4f, SNR=%(snr)5.2f dB, '
+                     'phase=%(phase)+.3f', carrier)
+        log.info('Drift: %+.2f ppm, recommended bitrate: %s',
+                 profile['drift'], profile['bitrate'])
+        if dst is not None:
+            dst.write(json.dumps(profile, indent=2).encode() + b'\n')
+        return profile
+    return None
+
+
+def volume_calibration(result_iterator, volume_ctl, iters_per_update=20):
+    """ Scale the volume every `iters_per_update` results (1 second, by
+    default), towards the target signal level - assuming the received
+    level is proportional to the volume. """
     min_level = 0.01
     max_level = 1.0
     level = 0.5
-    step = 0.25
+    max_factor = 4.0  # maximal volume change (per update)
 
     target_level = 0.4  # not too strong, not too weak
-    iters_per_update = 10  # update every 2 seconds
 
     for index, result in enumerate(itertools.chain([None], result_iterator)):
         if index % iters_per_update == 0:
             if index > 0:  # skip dummy (first result)
-                sign = 1 if (result['total'] < target_level) else -1
-                level = level + step * sign
-                level = min(max(level, min_level), max_level)
-                step = step * 0.5
+                total = result['total']
+                factor = target_level / total if total > 0 else max_factor
+                if result['peak'] >= 1.0:  # clipped (so total is too low)
+                    factor = min(factor, 0.5)
+                factor = min(max(factor, 1 / max_factor), max_factor)
+                level = min(max(level * factor, min_level), max_level)
 
             volume_ctl(level)  # should run "before" first actual iteration
 
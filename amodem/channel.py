@@ -0,0 +1,158 @@
+"""Channel simulation for offline testing of amodem.
+
+A channel is composed of impairments, which are applied (in order) on
+a stream of sample chunks, so long signals are processed chunk by chunk.
+The random impairments are seeded, so the results are reproducible.
+"""
+
+import abc
+import itertools
+
+import numpy as np
+
+from . import kernels
+from . import sampling
+
+
+class Impairment(abc.ABC):
+    """ Process each chunk using `process()`, keeping the state between
+    the chunks (so the result doesn't depend on the chunk sizes). """
+
+    def __call__(self, chunks):
+        for chunk in chunks:
+            yield self.process(np.asarray(chunk, dtype=float))
+
+    @abc.abstractmethod
+    def process(self, x):
+        """ Return the processed chunk. """
+
+
+class Noise(Impairment):
+    """ Additive white Gaussian noise, at `snr` [dB] relative to the signal
+    `power` (e.g. of the modulated data, see `bench.data_power()`). """
+
+    def __init__(self, snr, power, seed=None):
+        self.scale = np.sqrt(power / 10 ** (snr / 10.0))
+        self.random = np.random.RandomState(seed)
+
+    def process(self, x):
+        return x + self.random.normal(scale=self.scale, size=len(x))
+
+
+class Multipath(Impairment):
+    """ FIR filter, e.g. `[1, 0, 0, 0.3]` adds an echo delayed by 3 samples.
+    """
+
+    def __init__(self, taps):
+        self.taps = np.array(taps, dtype=float)
+        self.state = np.zeros(len(self.taps) - 1)  # previous input samples
+
+    def process(self, x):
+        if not x.size:
+            return x
+        x = np.concatenate([self.state, x])
+        self.state = x[len(x) - len(self.state):]
+        return kernels.fir(self.taps, x)
+
+
+class Drift:
+    """ Sampling clock drift [ppm] between the sender and the receiver,
+    using the receiver's (sinc) interpolation. """
+
+    chunk_size = 8 << 10
+
+    def __init__(self, ppm):
+        self.freq = 1.0 + ppm * 1e-6
+
+    def __call__(self, chunks):
+        samples = itertools.chain.from_iterable(chunks)
+        sampler = sampling.Sampler(samples, sampling.defaultInterpolator,
+                                   freq=self.freq)
+        while True:
+            chunk = sampler.take(self.chunk_size)
+            if not chunk.size:
+                return
+            yield chunk
+
+
+class Gain(Impairment):
+    """ Gain changes: starting at `gain`, and switching to each of
+    the `steps` gains at their offsets (given as (offset, gain) pairs). """
+
+    def __init__(self, gain=1.0, steps=()):
+        steps = sorted(steps)
+        self.offsets = np.array([offset for offset, _ in steps], dtype=int)
+        self.gains = np.array([gain] + [g for _, g in steps], dtype=float)
+        self.offset = 0
+
+    def process(self, x):
+        offsets = self.offset + np.arange(len(x))
+        self.offset += len(x)
+        return x * self.gains[np.searchsorted(self.offsets, offsets, 'right')]
+
+
+class Clip(Impairment):
+    """ Clipping at `level` (e.g. of a saturated ADC). """
+
+    def __init__(self, level=1.0):
+        self.level = level
+
+    def process(self, x):
+        return np.clip(x, -self.level, self.level)
+
+
+class Dropouts(Impairment):
+    """ Dropouts of `length` samples, each starting at a sample with
+    probability `rate`, replacing the signal with silence. """
+
+    def __init__(self, rate, length, seed=None):
+        self.rate = rate
+        self.length = length
+        self.random = np.random.RandomState(seed)
+        self.remaining = 0  # samples left in the current dropout
+
+    def process(self, x):
+        if not x.size:
+            return x
+        indices = np.arange(len(x))
+        starts = self.random.random_sample(len(x)) < self.rate
+        ends = np.where(starts, indices + self.length, self.remaining)
+        ends = np.maximum.accumulate(ends)
+        self.remaining = max(int(ends[-1]) - len(x), 0)
+        return np.where(indices < ends, 0.0, x)
+
+
+class Channel:
+    """ Apply the impairments in order, e.g.:
+
+        Channel(Multipath([1, 0, 0.2]), Drift(ppm=30),
+                Noise(snr=25, power=0.01, seed=0))
+    """
+
+    chunk_size = 8 << 10
+
+    def __init__(self, *impairments):
+        self.impairments = impairments
+
+    def __call__(self, chunks):
+        """ Process a stream of sample chunks, yielding the output chunks. """
+        for impairment in self.impairments:
+            chunks = impairment(chunks)
+        return chunks
+
+    def apply(self, x):
+        """ Process a whole signal. """
+        x = np.asarray(x, dtype=float)
+        chunks = (x[i:i+self.chunk_size]
+                  for i in range(0, len(x), self.chunk_size))
+        return np.concatenate([np.zeros(0)] + list(self(chunks)))
+
+
+def signal_power(x):
+    """ Mean power of the non-silent samples of the whole signal.
+    For a transmission, it includes the pilot prefix and the training
+    (which are louder than the data), so it shouldn't be used as an SNR
+    reference - see `bench.data_power()` instead. """
+    x = np.asarray(x, dtype=float)
+    x = x[x != 0]
+    return np.mean(x ** 2) if len(x) else 0.0
@@ -28,7 +28,35 @@ def loads(data):
 def dumps(sym):
     """ Dump signal to memory buffer. """
     sym = sym.real * scaling
-    return sym.astype('int16').tostring()
+    return sym.astype('int16').tobytes()
+
+
+class Writer:
+    """ Buffered output of a signal (as `dumps()` does), converting the
+    samples into a preallocated int16 buffer, which is written into `fd`
+    once `size` samples are buffered (or when flushed).
+    """
+
+    def __init__(self, fd, size):
+        self.fd = fd
+        self.buffer = np.zeros(size, dtype='int16')
+        self.length = 0  # of the buffered samples
+
+    def write(self, sym):
+        sym = np.asarray(sym).real
+        while len(sym):
+            size = min(len(sym), len(self.buffer) - self.length)
+            out = self.buffer[self.length:self.length + size]
+            np.multiply(sym[:size], scaling, out=out, casting='unsafe')
+            self.length += size
+            sym = sym[size:]
+            if self.length == len(self.buffer):
+                self.flush()
+
+    def flush(self):
+        if self.length:
+            self.fd.write(self.buffer[:self.length].tobytes())
+            self.length = 0
 
 
 def iterate(data, size, func=None, truncate=True, index=False):
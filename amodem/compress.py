@@ -0,0 +1,131 @@
+"""Streaming compression codecs for amodem.
+
+Each codec is identified in-band by the magic bytes of its stream format,
+so the receiver can select the matching decompressor automatically.
+"""
+
+import bz2
+import logging
+import lzma
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+log = logging.getLogger(__name__)
+
+
+class Codec:
+    def __init__(self, name, magic, compressobj, decompressobj, levels):
+        self.name = name
+        self.magic = magic
+        self.compressobj = compressobj  # level -> compression object
+        self.decompressobj = decompressobj
+        self.levels = levels  # supported compression levels
+
+
+codecs = {}
+
+
+def register(codec):
+    codecs[codec.name] = codec
+
+
+register(Codec(
+    name='zlib', magic=b'\x78',  # 32K window, deflate
+    compressobj=lambda level: zlib.compressobj(
+        -1 if level is None else level),
+    decompressobj=zlib.decompressobj, levels=range(-1, 10)))
+
+register(Codec(
+    name='bz2', magic=b'BZh',
+    compressobj=lambda level: bz2.BZ2Compressor(
+        9 if level is None else level),
+    decompressobj=bz2.BZ2Decompressor, levels=range(1, 10)))
+
+register(Codec(
+    name='lzma', magic=b'\xfd7zXZ\x00',
+    compressobj=lambda level: lzma.LZMACompressor(preset=level),
+    decompressobj=lzma.LZMADecompressor, levels=range(0, 10)))
+
+if zstandard:
+    register(Codec(
+        name='zstd', magic=b'\x28\xb5\x2f\xfd',
+        compressobj=lambda level: zstandard.ZstdCompressor(
+            level=3 if level is None else level).compressobj(),
+        decompressobj=lambda: zstandard.ZstdDecompressor().decompressobj(),
+        levels=range(1, zstandard.MAX_COMPRESSION_LEVEL + 1)))
+
+
+def detect(data):
+    """ Find the codec, whose stream starts with the given data. """
+    for codec in codecs.values():
+        if bytes(data).startswith(codec.magic):
+            return codec
+    raise ValueError('Unknown compression format')
+
+
+def check_level(codec, level):
+    """ Verify that the codec supports the compression level (if given). """
+    levels = codecs[codec].levels
+    if level is not None and level not in levels:
+        raise ValueError(f'{codec} compression level must be in '
+                         f'[{levels[0]}, {levels[-1]}] range')
+
+
+class Compressor:
+    def __init__(self, stream, codec='zlib', level=None):
+        check_level(codec, level)
+        codec = codecs[codec]
+        self.obj = codec.compressobj(level)
+        log.info('Using %s compressor', codec.name)
+        self.stream = stream
+
+    def read(self, size):
+        while True:
+            data = self.stream.read(size)
+            if data:
+                result = self.obj.compress(data)
+                if not result:  # compression is too good :)
+                    continue  # try again (since falsy data = EOF)
+            elif self.obj:
+                result = self.obj.flush()
+                self.obj = None
+            else:
+                result = b''  # EOF marker
+            return result
+
+
+class Decompressor:
+    magic_size = max(len(c.magic) for c in codecs.values())
+
+    def __init__(self, stream):
+        self.obj = None
+        self.buf = b''  # until the codec is detected
+        self.stream = stream
+
+    def _start(self):
+        codec = detect(self.buf)
+        log.info('Using %s decompressor', codec.name)
+        self.obj = codec.decompressobj()
+        data, self.buf = self.buf, b''
+        self.stream.write(self.obj.decompress(data))
+
+    def write(self, data):
+        if self.obj is None:
+            self.buf += bytes(data)
+            if len(self.buf) >= self.magic_size:
+                self._start()
+        else:
+            self.stream.write(self.obj.decompress(bytes(data)))
+
+    def flush(self):
+        if self.obj is None:
+            if not self.buf:
+                return  # no data was received
+            self._start()
+        flush = getattr(self.obj, 'flush', None)  # not supported by all codecs
+        if flush:
+            self.stream.write(flush())
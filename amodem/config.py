@@ -1,13 +1,27 @@
 """Configuration class."""
 
+import functools
+import json
+import os
+
 import numpy as np
 
+try:
+    import tomllib as toml
+except ImportError:
+    try:
+        import tomli as toml
+    except ImportError:
+        toml = None
+
 
 class Configuration:
     Fs = 32000.0  # sampling frequency [Hz]
     Tsym = 0.001  # symbol duration [seconds]
     Npoints = 64
     frequencies = [1e3, 8e3]  # use 1..8 kHz carriers
+    # (or pass explicit carrier frequencies, using the `carriers` argument)
+    gain = 1.0  # default modulator gain
 
     # audio config
     bits_per_sample = 16
@@ -17,12 +31,28 @@ class Configuration:
     silence_start = 0.5
     silence_stop = 0.5
 
+    # preamble config [symbols]
+    prefix_length = 200  # pilot carrier (for detection and gain estimation)
+    training_length = 200  # equalizer training (over all carriers)
+    silence_length = 50  # after the prefix, and around the training
+
+    # pilot carrier (at `carrier_index`) may keep sending a known symbol
+    # during the data, for tracking the receiver's sampling (using a PLL)
+    pilot = False
+    pilot_symbol = 1.0
+    pilot_interval = 10  # PLL update interval (and decoded block) [symbols]
+
+    # cyclic prefix (guard interval) before each data symbol [samples],
+    # absorbing the channel's echoes (which are shorter than the guard)
+    guard_length = 0
+
     # receiver config
     skip_start = 0.1
     timeout = 60.0
 
-    def __init__(self, **kwargs):
+    def __init__(self, carriers=None, **kwargs):
         self.__dict__.update(**kwargs)
+        self.settings = dict(kwargs, carriers=carriers)  # for `replace()`
 
         self.sample_size = self.bits_per_sample // 8
         assert self.sample_size * 8 == self.bits_per_sample
@@ -33,7 +63,9 @@ class Configuration:
         self.baud = int(1.0 / self.Tsym)
         assert self.baud * self.Tsym == 1
 
-        if len(self.frequencies) != 1:
+        if carriers is not None:  # explicit carrier frequencies
+            self.frequencies = np.array(carriers, dtype=float)
+        elif len(self.frequencies) == 2:  # [first, last] range of carriers
             first, last = self.frequencies
             self.frequencies = np.arange(first, last + self.baud, self.baud)
 
@@ -41,22 +73,52 @@ class Configuration:
         self.carrier_index = 0
         self.Fc = self.frequencies[self.carrier_index]
 
-        bits_per_symbol = int(np.log2(self.Npoints))
-        assert 2 ** bits_per_symbol == self.Npoints
-        self.bits_per_baud = bits_per_symbol * self.Nfreq
-        self.modem_bps = self.baud * self.bits_per_baud
+        if np.ndim(self.Npoints):  # per-carrier bit loading
+            npoints = list(self.Npoints)
+            assert len(npoints) == self.Nfreq
+        else:
+            npoints = [self.Npoints] * self.Nfreq
+        self.constellations = [qam(n) for n in npoints]
+        self.symbols = max(self.constellations, key=len)
+
+        bits = [int(np.log2(n)) for n in npoints]
+        if self.pilot:  # no data is sent over the pilot carrier
+            assert self.Nfreq > 1
+            bits[self.carrier_index] = 0
+        self.bits_per_baud = sum(bits)
+        self.symbol_length = self.Nsym + self.guard_length  # [samples]
+        self.modem_bps = (self.baud * self.bits_per_baud * self.Nsym //
+                          self.symbol_length)
+        # pilot carrier (followed by silence), as sent before the training
+        self.prefix = [1]*self.prefix_length + [0]*self.silence_length
+
         self.carriers = np.array([
             np.exp(2j * np.pi * f * np.arange(0, self.Nsym) * self.Ts)
             for f in self.frequencies
         ])
 
-        # QAM constellation
-        Nx = 2 ** int(np.ceil(bits_per_symbol // 2))
-        Ny = self.Npoints // Nx
-        symbols = [complex(x, y) for x in range(Nx) for y in range(Ny)]
-        symbols = np.array(symbols)
-        symbols = symbols - symbols[-1]/2
-        self.symbols = symbols / np.max(np.abs(symbols))
+    def replace(self, **overrides):
+        """ Return a new configuration, with some of the settings replaced.
+        """
+        settings = dict(self.settings)
+        if 'frequencies' in overrides:  # instead of the explicit carriers
+            settings.pop('carriers')
+        if overrides.get('carriers') is not None:
+            settings.pop('frequencies', None)
+        settings.update(overrides)
+        return Configuration(**settings)
+
+
+def qam(Npoints):
+    """ QAM constellation, normalized to unit peak amplitude. """
+    bits_per_symbol = int(np.log2(Npoints))
+    assert 2 ** bits_per_symbol == Npoints
+    Nx = 2 ** int(np.ceil(bits_per_symbol // 2))
+    Ny = Npoints // Nx
+    symbols = [complex(x, y) for x in range(Nx) for y in range(Ny)]
+    symbols = np.array(symbols)
+    symbols = symbols - symbols[-1]/2
+    return symbols / np.max(np.abs(symbols))
 
 
 # MODEM configurations for various bitrates [kbps]
@@ -79,12 +141,142 @@ bitrates = {
     64: Configuration(Fs=32e3, Npoints=256, frequencies=[3e3, 10e3]),
     72: Configuration(Fs=32e3, Npoints=256, frequencies=[2e3, 10e3]),
     80: Configuration(Fs=32e3, Npoints=256, frequencies=[2e3, 11e3]),
+    96: Configuration(Fs=48e3, Npoints=64, frequencies=[3e3, 18e3]),
+    120: Configuration(Fs=96e3, Npoints=64, frequencies=[1e3, 20e3]),
+    128: Configuration(Fs=48e3, Npoints=256, frequencies=[3e3, 18e3]),
+    144: Configuration(Fs=48e3, Npoints=256, frequencies=[2e3, 19e3]),
+    152: Configuration(Fs=96e3, Npoints=256, frequencies=[2e3, 20e3]),
+    160: Configuration(Fs=96e3, Npoints=256, frequencies=[2e3, 21e3]),
 }
 
 
-def fastest():
-    return bitrates[max(bitrates)]
+def fastest(Fs=32e3):
+    """ The fastest configuration using the given sampling rate (by default,
+    32 kHz, which is supported by most sound cards). """
+    rates = [rate for rate, cfg in bitrates.items() if cfg.Fs == Fs]
+    return bitrates[max(rates)]
 
 
 def slowest():
     return bitrates[min(bitrates)]
+
+
+# Profile file keys (see `Configuration` for their meaning)
+profile_keys = {
+    'Fs', 'Tsym', 'Npoints', 'frequencies', 'carriers', 'gain', 'latency',
+    'silence_start', 'silence_stop', 'skip_start', 'timeout',
+    'prefix_length', 'training_length', 'silence_length', 'pilot',
+    'guard_length', 'pilot_interval'
+}
+
+# Shortest preamble that is still detected and trained reliably [symbols]
+min_lengths = {'prefix_length': 40, 'training_length': 50, 'silence_length': 5}
+
+
+def _is_integer(x, eps=1e-9):
+    return abs(x - round(x)) < eps
+
+
+def _is_power_of_2(n):
+    return isinstance(n, int) and n >= 2 and (n & (n - 1)) == 0
+
+
+def _carriers(profile, Fs, Tsym):
+    if 'carriers' in profile:
+        if 'frequencies' in profile:
+            raise ValueError('Specify either carriers or frequencies')
+        carriers = list(profile['carriers'])
+    else:
+        frequencies = profile.get('frequencies', Configuration.frequencies)
+        if len(frequencies) != 2:
+            raise ValueError('frequencies must be a [first, last] range')
+        first, last = frequencies
+        carriers = list(np.arange(first, last + 1 / Tsym, 1 / Tsym))
+
+    if not carriers or len(set(carriers)) != len(carriers):
+        raise ValueError('Carriers must be distinct')
+    for f in carriers:
+        if not 0 < f < Fs / 2:
+            raise ValueError(f'Carrier {f} Hz is out of (0, Fs/2) range')
+        if not _is_integer(f * Tsym):
+            raise ValueError(f'Carrier {f} Hz is not a multiple of 1/Tsym')
+    return carriers
+
+
+def validate(profile):
+    """ Validate a profile dict, returning the matching configuration. """
+    try:
+        return _validate(profile)
+    except (AssertionError, TypeError) as e:  # e.g. non-numeric values
+        raise ValueError(f'Invalid profile: {e!r}') from e
+
+
+def _validate(profile):
+    unknown = set(profile) - profile_keys
+    if unknown:
+        raise ValueError(f'Unknown profile keys: {sorted(unknown)}')
+
+    profile = dict(profile)
+    Fs = profile.get('Fs', Configuration.Fs)
+    Tsym = profile.get('Tsym', Configuration.Tsym)
+    if Fs <= 0 or Tsym <= 0:
+        raise ValueError('Fs and Tsym must be positive')
+    if not _is_integer(Fs * Tsym) or not _is_integer(1 / Tsym):
+        raise ValueError('Tsym must be an integral number of samples '
+                         'and 1/Tsym an integral baud rate')
+    if int(1.0 / Tsym) * Tsym != 1:  # as required by `Configuration`
+        raise ValueError('1/Tsym must be exactly representable')
+
+    carriers = _carriers(profile, Fs=Fs, Tsym=Tsym)
+    profile.pop('frequencies', None)
+    profile['carriers'] = carriers
+
+    Npoints = profile.get('Npoints', Configuration.Npoints)
+    npoints = Npoints if isinstance(Npoints, list) else [Npoints]
+    if not all(_is_power_of_2(n) for n in npoints):
+        raise ValueError('Npoints must be a power of 2')
+    if isinstance(Npoints, list) and len(Npoints) != len(carriers):
+        raise ValueError('Npoints must be specified for each carrier')
+
+    if not 0 < profile.get('gain', Configuration.gain) <= 1:
+        raise ValueError('gain must be in (0, 1] range')
+
+    if profile.get('pilot') and len(carriers) < 2:
+        raise ValueError('pilot requires more than one carrier')
+    interval = profile.get('pilot_interval', Configuration.pilot_interval)
+    if not isinstance(interval, int) or interval < 1:
+        raise ValueError('pilot_interval must be a positive integer')
+
+    guard_length = profile.get('guard_length', 0)
+    if not isinstance(guard_length, int) or \
+            not 0 <= guard_length < round(Fs * Tsym):
+        raise ValueError('guard_length must be an integer in [0, Nsym) range')
+
+    for key, minimum in min_lengths.items():
+        length = profile.get(key, getattr(Configuration, key))
+        if not isinstance(length, int) or length < minimum:
+            raise ValueError(f'{key} must be an integer >= {minimum}')
+
+    return Configuration(**profile)
+
+
+def _parse(fname, data):
+    if os.path.splitext(fname)[1] == '.toml':
+        if toml is None:
+            raise ValueError('TOML profiles require Python 3.11 (or tomli)')
+        return toml.loads(data.decode())
+    return json.loads(data)
+
+
+@functools.lru_cache()
+def _load(fname, mtime):  # pylint: disable=unused-argument
+    with open(fname, 'rb') as f:
+        return validate(_parse(fname, f.read()))
+
+
+def load(fname):
+    """ Load a configuration profile from a JSON (or TOML) file.
+    Profiles are cached (until the file is modified).
+    """
+    fname = os.path.realpath(fname)
+    return _load(fname, os.stat(fname).st_mtime)
@@ -17,12 +17,19 @@ class Detector:
 
     COHERENCE_THRESHOLD = 0.9
 
+    # thresholds of the default configuration, for compatibility
+    # (the configured ones are the instance attributes below)
     CARRIER_DURATION = sum(equalizer.prefix)
     CARRIER_THRESHOLD = int(0.9 * CARRIER_DURATION)
     SEARCH_WINDOW = int(0.1 * CARRIER_DURATION)
     START_PATTERN_LENGTH = SEARCH_WINDOW // 4
 
     def __init__(self, config, pylab):
+        # thresholds are derived from the pilot carrier duration [symbols]
+        self.carrier_duration = sum(config.prefix)
+        self.carrier_threshold = int(0.9 * self.carrier_duration)
+        self.search_window = int(0.1 * self.carrier_duration)
+        self.start_pattern_length = self.search_window // 4
         self.freq = config.Fc
         self.omega = 2 * np.pi * self.freq / config.Fs
         self.Nsym = config.Nsym
@@ -30,11 +37,20 @@ class Detector:
         self.maxlen = config.baud  # 1 second of symbols
         self.max_offset = config.timeout * config.Fs
         self.plt = pylab
-
-    def _wait(self, samples):
+        n = (self.search_window + self.carrier_duration -
+             self.carrier_threshold)
+        self.trailing_size = n * self.Nsym
+
+    def waiter(self):
+        """ Wait for the carrier, receiving `Nsym` samples per send() call.
+        When the carrier is detected, its offset and the buffered samples
+        are returned (as the value of StopIteration).
+        """
         counter = 0
         bufs = collections.deque([], maxlen=self.maxlen)
-        for offset, buf in common.iterate(samples, self.Nsym, index=True):
+        offset = 0
+        while True:
+            buf = yield
             if offset > self.max_offset:
                 raise ValueError('Timeout waiting for carrier')
             bufs.append(buf)
@@ -45,15 +61,29 @@ class Detector:
             else:
                 counter = 0
 
-            if counter == self.CARRIER_THRESHOLD:
+            if counter == self.carrier_threshold:
                 return offset, bufs
+            offset += self.Nsym
+
+    def _wait(self, samples):
+        waiter = self.waiter()
+        next(waiter)
+        for buf in common.iterate(samples, self.Nsym):
+            try:
+                waiter.send(buf)
+            except StopIteration as e:
+                return e.value
 
         raise ValueError('No carrier detected')
 
     def run(self, samples):
         offset, bufs = self._wait(samples)
+        return self.locate(offset, bufs, samples)
 
-        length = (self.CARRIER_THRESHOLD - 1) * self.Nsym
+    def locate(self, offset, bufs, samples):
+        """ Find the carrier start, using the samples buffered by waiter()
+        and the following `trailing_size` samples. """
+        length = (self.carrier_threshold - 1) * self.Nsym
         begin = offset - length
 
         start_time = begin * self.Tsym / self.Nsym
@@ -62,25 +92,24 @@ class Detector:
 
         log.debug('Buffered %d ms of audio', len(bufs))
 
-        bufs = list(bufs)[-self.CARRIER_THRESHOLD-self.SEARCH_WINDOW:]
-        n = self.SEARCH_WINDOW + self.CARRIER_DURATION - self.CARRIER_THRESHOLD
-        trailing = list(itertools.islice(samples, n * self.Nsym))
+        bufs = list(bufs)[-self.carrier_threshold-self.search_window:]
+        trailing = list(itertools.islice(samples, self.trailing_size))
         bufs.append(np.array(trailing))
 
         buf = np.concatenate(bufs)
         offset = self.find_start(buf)
-        start_time += (offset / self.Nsym - self.SEARCH_WINDOW) * self.Tsym
+        start_time += (offset / self.Nsym - self.search_window) * self.Tsym
         log.debug('Carrier starts at %.3f ms', start_time * 1e3)
 
         buf = buf[offset:]
 
-        prefix_length = self.CARRIER_DURATION * self.Nsym
+        prefix_length = self.carrier_duration * self.Nsym
         amplitude, freq_err = self.estimate(buf[:prefix_length])
         return itertools.chain(buf, samples), amplitude, freq_err
 
     def find_start(self, buf):
         carrier = dsp.exp_iwt(self.omega, self.Nsym)
-        carrier = np.tile(carrier, self.START_PATTERN_LENGTH)
+        carrier = np.tile(carrier, self.start_pattern_length)
         zeroes = carrier * 0.0
         signal = np.concatenate([zeroes, carrier])
         signal = (2 ** 0.5) * signal / dsp.norm(signal)
@@ -3,41 +3,107 @@
 import numpy as np
 
 from . import common
+from . import kernels
 
 
 class FIR:
     def __init__(self, h):
         self.h = np.array(h)
-        self.x_state = [0] * len(self.h)
+        self.x_state = np.zeros(len(self.h))  # most recent sample first
 
     def __call__(self, x):
-        x_ = self.x_state
-        h = self.h
-        for v in x:
-            x_ = [v] + x_[:-1]
-            yield np.dot(x_, h)
-        self.x_state = x_
+        x = np.asarray(x, dtype=float)
+        if not len(x):  # pylint: disable=len-as-condition
+            return
+        x = np.concatenate([self.x_state[-2::-1], x])
+        y = kernels.fir(self.h, x)
+        self.x_state = x[:-len(self.h)-1:-1]
+        yield from y
 
 
 class Demux:
-    def __init__(self, sampler, omegas, Nsym):
+    def __init__(self, sampler, omegas, Nsym, filters=None):
         self.Nsym = Nsym
-        self.filters = [exp_iwt(-w, Nsym) / (0.5*self.Nsym) for w in omegas]
-        self.filters = np.array(self.filters)
+        self.guard = 0  # cyclic prefix length [samples]
+        self.margin = 0  # window advance into the cyclic prefix [samples]
+        self.bins = fft_bins(omegas, Nsym)  # FFT is used (if not None)
+        if filters is None and self.bins is None:
+            filters = demux_filters(omegas, Nsym)
+        self.filters = filters
         self.sampler = sampler
 
     def __iter__(self):
         return self
 
     def next(self):
-        frame = self.sampler.take(size=self.Nsym)
-        if len(frame) == self.Nsym:
+        frame = self.sampler.take(size=self.guard + self.Nsym)
+        if len(frame) == self.guard + self.Nsym:
+            start = self.guard - self.margin
+            frame = frame[start:start+self.Nsym]
+            if self.bins is not None:
+                return np.fft.rfft(frame)[self.bins] / (0.5*self.Nsym)
             return np.dot(self.filters, frame)
         raise StopIteration
 
     __next__ = next
 
 
+def demux_filters(omegas, Nsym):
+    return np.array([exp_iwt(-w, Nsym) / (0.5*Nsym) for w in omegas])
+
+
+def demux_block(signal, omegas, Nsym, filters=None):
+    """ Demultiplex a signal of complete symbols at once, returning
+    a row of the carriers' symbols per symbol. """
+    frames = np.reshape(signal, (-1, Nsym))
+    bins = fft_bins(omegas, Nsym)
+    if bins is not None:
+        return np.fft.rfft(frames, axis=1)[:, bins] / (0.5*Nsym)
+    if filters is None:
+        filters = demux_filters(omegas, Nsym)
+    return np.dot(frames, filters.T)
+
+
+# Correlating each carrier is faster for smaller symbols (in MACs/symbol)
+fft_threshold = 1024
+
+
+def fft_bins(omegas, Nsym):
+    """ Return the carriers' FFT bins, if they lie on the FFT grid (i.e.
+    have an integral number of cycles per symbol) and the FFT is cheaper
+    than correlating each carrier. Otherwise, return None. """
+    bins = np.asarray(omegas, dtype=float) * Nsym / (2 * np.pi)
+    indices = np.round(bins).astype(int)
+    if len(bins) * Nsym < fft_threshold or np.any(abs(bins - indices) > 1e-9):
+        return None
+    if np.any(indices <= 0) or np.any(2 * indices >= Nsym):
+        return None
+    return indices
+
+
+class Modulator:
+    """ Modulate a symbol per carrier into a real signal (of `Nsym`
+    samples), using inverse FFT if the carriers lie on the FFT grid.
+    Multiple symbols (a row per symbol) are modulated into a row each. """
+
+    def __init__(self, omegas, Nsym, gain=1.0):
+        self.Nsym = Nsym
+        self.bins = fft_bins(omegas, Nsym)
+        self.gain = gain
+        self.carriers = None
+        if self.bins is None:
+            self.carriers = np.array([exp_iwt(w, Nsym) for w in omegas])
+
+    def __call__(self, symbols):
+        if self.bins is None:
+            return np.dot(symbols, self.carriers).real * self.gain
+        symbols = np.asarray(symbols)
+        spectrum = np.zeros(symbols.shape[:-1] + (self.Nsym // 2 + 1,),
+                            dtype=complex)
+        spectrum[..., self.bins] = symbols * (0.5 * self.Nsym * self.gain)
+        return np.fft.irfft(spectrum, self.Nsym)
+
+
 def exp_iwt(omega, n):
     return np.exp(1j * omega * np.arange(n))
 
@@ -92,6 +158,8 @@ class MODEM:
 
         bits_map = dict(item[::-1] for item in self.encode_map.items())
         self.decode_list = [(s, bits_map[s]) for s in self.symbols]
+        self.bits_table = np.array([bits for _, bits in self.decode_list],
+                                   dtype=int).reshape(len(symbols), -1)
 
     def encode(self, bits):
         for bits_tuple in common.iterate(bits, self.bits_per_symbol, tuple):
@@ -102,13 +170,46 @@ class MODEM:
         symbols_vec = self.symbols
         _dec = self.decode_list
         for received in symbols:
-            error = np.abs(symbols_vec - received)
-            index = np.argmin(error)
+            index = kernels.nearest(symbols_vec, received)
             decoded, bits = _dec[index]
             if error_handler:
                 error_handler(received=received, decoded=decoded)
             yield bits
 
+    def decode_block(self, received):
+        """ Vectorized decoding of an array of received symbols.
+        Returns the decoded symbols, and their bits (along the last axis).
+        """
+        indices = kernels.nearest(self.symbols, received)
+        return self.symbols[indices], self.bits_table[indices]
+
+    def llr_block(self, received, noise_var):
+        """ Soft decoding of an array of received symbols, using the max-log
+        approximation for complex Gaussian noise of `noise_var` variance
+        (broadcast to the received symbols' shape).
+        Returns the bits' log-likelihood ratios (along the last axis),
+        where positive values favor 0 bits.
+        """
+        received = np.asarray(received)
+        distances = np.abs(received[..., None] - self.symbols) ** 2
+        distances = distances[..., None, :]  # broadcast over the bits
+        ones = self.bits_table.T.astype(bool)  # [bit, symbol]
+        d0 = np.min(np.where(ones, np.inf, distances), axis=-1)
+        d1 = np.min(np.where(ones, distances, np.inf), axis=-1)
+        return (d1 - d0) / np.asarray(noise_var)[..., None]
+
+
+def modems(constellations):
+    """ Create a MODEM per constellation (sharing identical ones). """
+    cache = {}
+    result = []
+    for symbols in constellations:
+        key = tuple(symbols)
+        if key not in cache:
+            cache[key] = MODEM(symbols)
+        result.append(cache[key])
+    return result
+
 
 def prbs(reg, poly, bits):
     """ Simple pseudo-random number generator. """
@@ -4,20 +4,42 @@ import itertools
 
 import numpy as np
 
+from . import config as _config
 from . import dsp
+from . import kernels
 from . import sampling
-from . import levinson
 
 
 class Equalizer:
 
     def __init__(self, config):
-        self.carriers = config.carriers
         self.omegas = 2 * np.pi * np.array(config.frequencies) / config.Fs
         self.Nfreq = config.Nfreq
         self.Nsym = config.Nsym
+        self.modulate = dsp.Modulator(self.omegas, self.Nsym,
+                                      gain=1.0 / self.Nfreq)
+        self.guard_length = config.guard_length  # cyclic prefix [samples]
+        self.cache = {}  # training symbols and signals (by length)
 
     def train_symbols(self, length, constant_prefix=16):
+        """ Training symbols (the result is cached, so it's read-only). """
+        key = ('symbols', length, constant_prefix)
+        if key not in self.cache:
+            symbols = self._train_symbols(length, constant_prefix)
+            symbols.flags.writeable = False
+            self.cache[key] = symbols
+        return self.cache[key]
+
+    def train_signal(self, length):
+        """ Modulated training symbols (cached and read-only). """
+        key = ('signal', length)
+        if key not in self.cache:
+            signal = self.modulator(self.train_symbols(length))
+            signal.flags.writeable = False
+            self.cache[key] = signal
+        return self.cache[key]
+
+    def _train_symbols(self, length, constant_prefix):
         r = dsp.prbs(reg=1, poly=0x1100b, bits=2)
         constellation = [1, 1j, -1, -1j]
 
@@ -31,24 +53,25 @@ class Equalizer:
         return symbols
 
     def modulator(self, symbols):
-        gain = 1.0 / len(self.carriers)
-        result = []
-        for s in symbols:
-            result.append(np.dot(s, self.carriers))
-        result = np.concatenate(result).real * gain
-        assert np.max(np.abs(result)) <= 1
+        signals = self.modulate(np.asarray(symbols).reshape(-1, self.Nfreq))
+        cyclic_prefix = signals[:, self.Nsym-self.guard_length:]
+        result = np.concatenate([cyclic_prefix, signals], axis=1).ravel()
+        assert np.max(np.abs(result)) <= 1 + 1e-12  # (rounding errors)
         return result
 
     def demodulator(self, signal, size):
         signal = itertools.chain(signal, itertools.repeat(0))
         symbols = dsp.Demux(sampler=sampling.Sampler(signal),
                             omegas=self.omegas, Nsym=self.Nsym)
+        symbols.guard = self.guard_length
         return np.array(list(itertools.islice(symbols, size)))
 
 
-equalizer_length = 200
-silence_length = 50
-prefix = [1]*equalizer_length + [0]*silence_length
+# preamble lengths of the default configuration [symbols], for compatibility
+# (the configured lengths are `Configuration` attributes)
+equalizer_length = _config.Configuration.training_length
+silence_length = _config.Configuration.silence_length
+prefix = [1]*_config.Configuration.prefix_length + [0]*silence_length
 
 
 def train(signal, expected, order, lookahead=0):
@@ -63,4 +86,4 @@ def train(signal, expected, order, lookahead=0):
     for i in range(N):
         Rxx[i] = np.dot(x[i:], x[:len(x)-i])
         Rxy[i] = np.dot(y[i:], x[:len(x)-i])
-    return levinson.solver(t=Rxx, y=Rxy)
+    return kernels.solver(t=Rxx, y=Rxy)
@@ -39,21 +39,28 @@ class Framer:
     checksum = Checksum()
 
     EOF = b''
+    FILL = 0  # length of idle frames (sent while a live source is empty)
 
-    def _pack(self, block):
+    def pack(self, block):
         frame = self.checksum.encode(block)
         return bytearray(struct.pack(self.prefix_fmt, len(frame)) + frame)
 
+    def fill(self):
+        """ Idle frame (with no checksum), skipped by the receiver. """
+        return bytearray(struct.pack(self.prefix_fmt, self.FILL))
+
     def encode(self, data):
         for block in common.iterate(data=data, size=self.block_size,
                                     func=bytearray, truncate=False):
-            yield self._pack(block=block)
-        yield self._pack(block=self.EOF)
+            yield self.pack(block=block)
+        yield self.pack(block=self.EOF)
 
     def decode(self, data):
         data = iter(data)
         while True:
             length, = _take_fmt(data, self.prefix_fmt)
+            if length == self.FILL:
+                continue
             frame = _take_len(data, length)
             block = self.checksum.decode(frame)
             if block == self.EOF:
@@ -63,6 +70,46 @@ class Framer:
             yield block
 
 
+class FrameDecoder:
+    """ Incremental frame decoding, for received bits pushed via feed(). """
+
+    def __init__(self, framer=None):
+        self.framer = framer or Framer()
+        self.converter = BitPacker()
+        self.bits = []
+        self.data = bytearray()
+        self.eof = False  # set when the EOF frame is decoded
+
+    def feed(self, bits):
+        """ Add received bits, returning the completely received frames. """
+        self.bits.extend(bits)
+        size = len(self.bits) - len(self.bits) % BitPacker.byte_size
+        for i in range(0, size, BitPacker.byte_size):
+            chunk = tuple(self.bits[i:i+BitPacker.byte_size])
+            self.data.append(self.converter.to_byte[chunk])
+        del self.bits[:size]
+
+        frames = []
+        prefix_len = self.framer.prefix_len
+        while not self.eof and len(self.data) >= prefix_len:
+            length, = struct.unpack(self.framer.prefix_fmt,
+                                    bytes(self.data[:prefix_len]))
+            if len(self.data) < prefix_len + length:
+                break  # wait for the rest of the frame
+            frame = self.data[prefix_len:prefix_len+length]
+            del self.data[:prefix_len+length]
+            if length == self.framer.FILL:
+                continue
+
+            block = self.framer.checksum.decode(frame)
+            if block == self.framer.EOF:
+                log.debug('EOF frame detected')
+                self.eof = True
+            else:
+                frames.append(bytes(block))
+        return frames
+
+
 def _take_fmt(data, fmt):
     length = struct.calcsize(fmt)
     chunk = bytearray(itertools.islice(data, length))
@@ -108,6 +155,15 @@ def encode(data, framer=None):
             yield converter.to_bits[byte]
 
 
+_packer = BitPacker()  # shared by `to_bits()`, which is called per block
+
+
+def to_bits(frames):
+    """ Convert the packed frames into a list of bits. """
+    return [bit for frame in frames
+            for byte in frame for bit in _packer.to_bits[byte]]
+
+
 @chain_wrapper
 def _to_bytes(bits):
     converter = BitPacker()
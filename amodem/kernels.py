@@ -0,0 +1,178 @@
+"""Accelerated kernels for the innermost loops of amodem.
+
+The reference kernels use NumPy. When `numba` is installed, JIT-compiled
+kernels are selected instead (unless `AMODEM_KERNELS=numpy` is set).
+The kernels are looked up via this module on each call, so `select()` may
+switch the implementation at runtime.
+"""
+
+import logging
+import os
+
+import numpy as np
+
+from . import levinson
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+log = logging.getLogger(__name__)
+
+
+def interpolate(filt, buff, starts, phases):
+    """ Apply the polyphase filters `filt[phases]` on the windows of `buff`
+    starting at `starts` (each window is `filt.shape[1]` samples long). """
+    windows = np.lib.stride_tricks.sliding_window_view(buff, filt.shape[1])
+    return np.einsum('ij,ij->i', filt[phases], windows[starts])
+
+
+def fir(h, x):
+    """ Convolve `x` with `h`, returning only the fully overlapping outputs.
+    Note: `x` must not be shorter than `h`. """
+    return np.convolve(x, h, mode='valid')
+
+
+def nearest(symbols, received):
+    """ Find the indices of the nearest symbols to the received ones. """
+    received = np.asarray(received)
+    return np.argmin(np.abs(symbols - received[..., None]), axis=-1)
+
+
+solver = levinson.solver
+
+implementations = {
+    'numpy': {
+        'interpolate': interpolate,
+        'fir': fir,
+        'nearest': nearest,
+        'solver': solver,
+    }
+}
+
+
+def _interpolate_loop(filt, buff, starts, phases):
+    width = filt.shape[1]
+    result = np.empty(len(starts))
+    for i, start in enumerate(starts):
+        coeffs = filt[phases[i]]
+        acc = 0.0
+        for m in range(width):
+            acc += coeffs[m] * buff[start + m]
+        result[i] = acc
+    return result
+
+
+def _fir_loop(h, x):
+    n = len(h)
+    size = len(x) - n + 1
+    result = np.empty(size)
+    for i in range(size):
+        acc = 0.0
+        for m in range(n):
+            acc += h[m] * x[i + n - 1 - m]
+        result[i] = acc
+    return result
+
+
+def _nearest_symbol(symbols, value):
+    best = np.inf
+    index = 0
+    for j, symbol in enumerate(symbols):
+        error = abs(symbol - value)
+        if error < best:
+            best = error
+            index = j
+    return index
+
+
+def _nearest_loop(symbols, received):
+    result = np.empty(len(received), dtype=np.int64)
+    for i, value in enumerate(received):
+        result[i] = _nearest_symbol(symbols, value)
+    return result
+
+
+def _solver_loop(t, y):
+    N = len(t)
+    f = np.zeros(N)  # forward vector
+    b = np.zeros((N, N))  # backward vectors (n-th vector is b[n, :n+1])
+    f[0] = b[0, 0] = 1.0 / t[0]
+    for n in range(1, N):
+        ef = 0.0
+        eb = 0.0
+        for i in range(n):
+            ef += t[n-i] * f[i]
+            eb += t[i+1] * b[n-1, i]
+        det = 1.0 - ef * eb
+        prev_f = f.copy()
+        for i in range(n + 1):
+            f_i = prev_f[i] if i < n else 0.0
+            b_i = b[n-1, i-1] if i > 0 else 0.0
+            f[i] = (f_i - ef * b_i) / det
+            b[n, i] = (b_i - eb * f_i) / det
+
+    x = np.zeros(N)
+    for n in range(N):
+        ef = 0.0
+        for i in range(n):
+            ef += t[n-i] * x[i]
+        for i in range(n + 1):
+            x[i] += (y[n] - ef) * b[n, i]
+    return x
+
+
+if numba is not None:
+    _jit = numba.njit(cache=True, nogil=True)  # for pipelined receiver
+    _interpolate_jit = _jit(_interpolate_loop)
+    _fir_jit = _jit(_fir_loop)
+    _nearest_symbol = _jit(_nearest_symbol)
+    _nearest_jit = _jit(_nearest_loop)
+    _solver_jit = _jit(_solver_loop)
+
+    def _interpolate_numba(filt, buff, starts, phases):
+        return _interpolate_jit(filt, buff, starts, phases)
+
+    def _fir_numba(h, x):
+        return _fir_jit(np.asarray(h, dtype=float), x)
+
+    def _nearest_numba(symbols, received):
+        symbols = np.asarray(symbols, dtype=complex)
+        if np.ndim(received):
+            received = np.asarray(received, dtype=complex)
+            indices = _nearest_jit(symbols, received.ravel())
+            return indices.reshape(received.shape)
+        return _nearest_symbol(symbols, complex(received))
+
+    def _solver_numba(t, y):
+        return _solver_jit(np.asarray(t, dtype=float),
+                           np.asarray(y, dtype=float))
+
+    implementations['numba'] = {
+        'interpolate': _interpolate_numba,
+        'fir': _fir_numba,
+        'nearest': _nearest_numba,
+        'solver': _solver_numba,
+    }
+
+backend = 'numpy'
+
+
+def select(name=None):
+    """ Select the kernels' implementation (by default, the fastest one). """
+    if name is None:
+        name = os.environ.get('AMODEM_KERNELS')
+    if name is None:
+        name = 'numba' if 'numba' in implementations else 'numpy'
+    if name not in implementations:
+        raise ValueError(f'Unsupported kernels: {name!r} '
+                         f'(available: {", ".join(implementations)})')
+
+    globals().update(implementations[name])
+    global backend  # pylint: disable=global-statement
+    backend = name
+    log.debug('Using %s kernels', name)
+
+
+select()
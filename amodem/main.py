@@ -1,5 +1,6 @@
 import itertools
 import logging
+import time
 
 import numpy as np
 
@@ -10,8 +11,94 @@ from . import framing, common, stream, detect, sampling
 log = logging.getLogger(__name__)
 
 
-def send(config, src, dst, gain=1.0, extra_silence=0.0):
-    sender = _send.Sender(dst, config=config, gain=gain)
+class Session:
+    """ Reusable MODEM session, for sending and receiving many transfers.
+    The precomputed tables (carriers, MODEMs, demux filters and training
+    signals) are kept between the transfers.
+    Keyword arguments (e.g. `pipeline`) are passed to the receiver.
+    """
+
+    def __init__(self, config, gain=None, pylab=None, **kwargs):
+        self.config = config
+        self.gain = config.gain if gain is None else gain
+        self.pylab = pylab or common.Dummy()
+        self.kwargs = kwargs
+        self.sender = None  # created on first use
+        self.receiver = None
+
+    def send(self, src, dst, extra_silence=0.0, streaming=False):
+        """ Send the data from `src` into `dst`.
+        In streaming mode, the data is sent as soon as it arrives (with idle
+        frames keeping the carrier up) until `src` is closed.
+        """
+        if self.sender is None:
+            self.sender = _send.Sender(dst, config=self.config,
+                                       gain=self.gain)
+        self.sender.reset(dst)
+        send_data = _stream_data if streaming else _send_data
+        return send_data(self.config, self.sender, src, extra_silence)
+
+    def recv(self, src, dst, dump_audio=None):
+        try:
+            for data, _ in self.recv_iter(src, dump_audio):
+                dst.write(data)
+            return True
+        except BaseException:  # pylint: disable=broad-except
+            log.exception('Decoding failed')
+            return False
+        finally:
+            dst.flush()
+
+    def recv_iter(self, src, dump_audio=None):
+        """ Receive data from `src`, yielding (data, stats) pairs as soon as
+        each frame is received (and verified).
+        The stats dict contains the data's `offset` in the received payload,
+        and the receiver's live stats (`snr`, `drift` and `time`).
+        Errors are raised to the caller.
+        """
+        receiver = self._receiver()
+        try:
+            sampler, gain = _detect(self.config, src, dump_audio, self.pylab)
+            offset = 0
+            for frame in receiver.frames(sampler, gain=gain):
+                yield frame, dict(receiver.live_stats(), offset=offset)
+                offset += len(frame)
+        finally:
+            receiver.report()
+
+    def recv_soft(self, src, dump_audio=None):
+        """ Receive soft decisions from `src`, yielding an array of the bits'
+        log-likelihood ratios per block of symbols (for a soft-decision FEC
+        decoder). The frames are not decoded, so the caller should stop
+        when the expected bits are received (otherwise, an error is raised
+        when `src` ends).
+        """
+        receiver = self._receiver()
+        sampler, gain = _detect(self.config, src, dump_audio, self.pylab)
+        symbols = receiver.start(sampler, gain=gain)
+        bitstream = receiver.bitstream(sampler, symbols, soft=True)
+        try:
+            yield from bitstream
+        finally:
+            bitstream.close()  # stop the pipeline threads (if running)
+
+    def _receiver(self):
+        if self.receiver is None:
+            self.receiver = _recv.Receiver(config=self.config,
+                                           pylab=self.pylab, **self.kwargs)
+        self.receiver.reset()
+        return self.receiver
+
+
+def send(config, src, dst, gain=None, **kwargs):
+    """ Send the data from `src` into `dst`.
+    Keyword arguments (e.g. `streaming`) are passed to `Session.send()`.
+    """
+    session = Session(config, gain=gain)
+    return session.send(src, dst, **kwargs)
+
+
+def _send_training(config, sender, extra_silence):
     Fs = config.Fs
 
     # pre-padding audio with silence (priming the audio sending queue)
@@ -21,23 +108,107 @@ def send(config, src, dst, gain=1.0, extra_silence=0.0):
 
     training_duration = sender.offset
     log.info('Sending %.3f seconds of training audio', training_duration / Fs)
+    return training_duration
 
-    reader = stream.Reader(src, eof=True)
-    data = itertools.chain.from_iterable(reader)
-    bits = framing.encode(data)
+
+def send_blocks(config, sender, extra_silence=0.0):
+    """ Modulate the training, and then the data blocks (of
+    `Framer.block_size` bytes) which are sent into this generator, where
+    a partial (or an empty) block is the last one.
+    It yields after each step's audio is written into the sender, so the
+    caller may flush it before sending the next block.
+    """
+    Fs = config.Fs
+    training_duration = _send_training(config, sender, extra_silence)
+
+    framer = framing.Framer()
+    bits = []
+    total = 0
     log.info('Starting modulation')
-    sender.modulate(bits=bits)
+    while True:
+        block = yield
+        total += len(block)
+        frames = [framer.pack(block)] if block else []
+        if len(block) < framer.block_size:
+            frames.append(framer.pack(framer.EOF))
+        bits.extend(framing.to_bits(frames))
+        if len(block) < framer.block_size:
+            break
+        size = len(bits) - len(bits) % sender.bits_per_baud
+        sender.modulate(bits[:size], pad=False)
+        del bits[:size]
+
+    sender.modulate(bits)
+    data_duration = sender.offset - training_duration
+    log.info('Sent %.3f kB @ %.3f seconds', total / 1e3, data_duration / Fs)
+
+    # post-padding audio with silence
+    sender.write(np.zeros(int(Fs * config.silence_stop)))
+    sender.flush()
+    yield
+
+
+def _send_data(config, sender, src, extra_silence):
+    steps = send_blocks(config, sender, extra_silence)
+    next(steps)  # the training
 
+    size = framing.Framer.block_size
+    data = itertools.chain.from_iterable(stream.Reader(src, eof=True))
+    blocks = common.iterate(data, size=size, func=bytearray, truncate=False)
+    for block in itertools.chain(blocks, [bytearray()]):
+        steps.send(block)
+        if len(block) < size:  # the last block
+            break
+    return True
+
+
+def _stream_data(config, sender, src, extra_silence):
+    Fs = config.Fs
+    training_duration = _send_training(config, sender, extra_silence)
+
+    feed = stream.Feed(src)
+    framer = framing.Framer()
+    # keep the carrier up while the source is idle
+    idle_bits = int(config.latency * config.baud) * sender.bits_per_baud
+    log.info('Starting modulation (streaming)')
+    start_time = time.time() - sender.offset / Fs  # by the sample clock
+    while not feed.eof:
+        # the audio which is sent, but not played yet
+        queued = sender.offset / Fs - (time.time() - start_time)
+        # send idle frames only when less than `latency` audio is queued
+        data = feed.read(timeout=max(queued - config.latency, 0))
+        bits = _stream_bits(framer, data, sender.bits_per_baud,
+                            idle_bits=0 if feed.eof else idle_bits)
+        sender.modulate(bits, pad=False)
+        sender.flush()  # without waiting for more data
+
+    sender.modulate(framing.to_bits([framer.pack(framer.EOF)]))
     data_duration = sender.offset - training_duration
     log.info('Sent %.3f kB @ %.3f seconds',
-             reader.total / 1e3, data_duration / Fs)
+             feed.total / 1e3, data_duration / Fs)
 
     # post-padding audio with silence
     sender.write(np.zeros(int(Fs * config.silence_stop)))
+    sender.flush()
     return True
 
 
-def recv(config, src, dst, dump_audio=None, pylab=None):
+def _stream_bits(framer, data, bits_per_baud, idle_bits):
+    """ Pack the data into frames, appending idle frames to complete the
+    last symbol (so the data is sent without delay). Without data,
+    `idle_bits` of idle frames are returned. """
+    blocks = common.iterate(data, size=framer.block_size,
+                            func=bytearray, truncate=False)
+    bits = framing.to_bits(framer.pack(block) for block in blocks)
+    min_bits = 0 if bits else idle_bits
+    fill = framing.to_bits([framer.fill()])
+    while len(bits) < min_bits or len(bits) % bits_per_baud:
+        bits.extend(fill)
+    return bits
+
+
+def _detect(config, src, dump_audio, pylab):
+    """ Detect the carrier, returning a compensated sampler and gain. """
     if dump_audio:
         src = stream.Dumper(src, dump_audio)
     reader = stream.Reader(src, data_type=common.loads)
@@ -46,26 +217,51 @@ def recv(config, src, dst, dump_audio=None, pylab=None):
     log.debug('Skipping %.3f seconds', config.skip_start)
     common.take(signal, int(config.skip_start * config.Fs))
 
-    pylab = pylab or common.Dummy()
     detector = detect.Detector(config=config, pylab=pylab)
+    log.info('Waiting for carrier tone: %.1f kHz', config.Fc / 1e3)
+    return compensate(*detector.run(signal))
+
+
+def compensate(signal, amplitude, freq_error):
+    """ Compensate the detected carrier's frequency and amplitude. """
+    freq = 1 / (1.0 + freq_error)  # receiver's compensated frequency
+    log.debug('Frequency correction: %.3f ppm', (freq - 1) * 1e6)
+
+    gain = 1.0 / amplitude
+    log.debug('Gain correction: %.3f', gain)
+
+    sampler = sampling.Sampler(signal, sampling.defaultInterpolator,
+                               freq=freq)
+    return sampler, gain
+
+
+def recv(config, src, dst, dump_audio=None, pylab=None, **kwargs):
+    """ Receive data from `src`, writing it into `dst`.
+    Keyword arguments (e.g. `pipeline`) are passed to the receiver.
+    """
+    session = Session(config, pylab=pylab, **kwargs)
+    return session.recv(src, dst, dump_audio=dump_audio)
+
+
+def recv_iter(config, src, dump_audio=None, pylab=None, **kwargs):
+    """ See `Session.recv_iter()`. """
+    session = Session(config, pylab=pylab, **kwargs)
+    return session.recv_iter(src, dump_audio=dump_audio)
+
+
+def probe(config, src, dump_audio=None, pylab=None):
+    """ Measure the channel using the prefix and training of a transmission.
+    Returns a dict with per-carrier SNR [dB] and sampling drift [ppm].
+    """
+    pylab = pylab or common.Dummy()
     receiver = _recv.Receiver(config=config, pylab=pylab)
+    sampler, gain = _detect(config, src, dump_audio, pylab)
     try:
-        log.info('Waiting for carrier tone: %.1f kHz', config.Fc / 1e3)
-        signal, amplitude, freq_error = detector.run(signal)
-
-        freq = 1 / (1.0 + freq_error)  # receiver's compensated frequency
-        log.debug('Frequency correction: %.3f ppm', (freq - 1) * 1e6)
-
-        gain = 1.0 / amplitude
-        log.debug('Gain correction: %.3f', gain)
-
-        sampler = sampling.Sampler(signal, sampling.defaultInterpolator,
-                                   freq=freq)
-        receiver.run(sampler, gain=1.0/amplitude, output=dst)
-        return True
-    except BaseException:  # pylint: disable=broad-except
-        log.exception('Decoding failed')
-        return False
-    finally:
-        dst.flush()
-        receiver.report()
+        receiver.start(sampler, gain=gain)
+    except AssertionError:  # SNR is still reported for failed training
+        log.warning('Training failed')
+    return {
+        'snr': dict(zip(config.frequencies, receiver.training_snr)),
+        'drift': (1.0 - sampler.freq) * 1e6,
+        'gain': gain,
+    }
@@ -0,0 +1,92 @@
+"""Channel probing and bitrate selection for amodem."""
+
+import logging
+
+import numpy as np
+
+from . import config as _config
+
+log = logging.getLogger(__name__)
+
+# Probe transmissions use all the carriers of the 32 kHz configurations
+# (the lowest sampling rate that is common to the faster profiles)
+config = _config.Configuration(Fs=32e3, Npoints=4, frequencies=[1e3, 11e3])
+
+# Noise margin (in standard deviations) for reliable symbol decisions
+margin = 5.0
+
+
+def required_snr(symbols):
+    """ Minimal training SNR [dB] for reliable decoding of a constellation.
+    The noise (per dimension) should be `margin` times smaller than
+    half of the minimal distance between the constellation points.
+    """
+    symbols = np.array(symbols)
+    distances = np.abs(symbols[:, None] - symbols[None, :])
+    d_min = np.min(distances[distances > 0])
+    return 20 * np.log10(np.sqrt(2) * margin / d_min)
+
+
+def supports(cfg, snr):
+    """ Check that the measured SNRs allow decoding the configuration. """
+    required = required_snr(cfg.symbols)
+    for freq in cfg.frequencies:
+        if freq not in snr or snr[freq] < required:
+            return False
+    return True
+
+
+def recommend(snr, bitrates=None):
+    """ Find the fastest bitrate supported by the measured SNRs.
+    Returns None if no bitrate is supported.
+    """
+    bitrates = _config.bitrates if bitrates is None else bitrates
+    for rate in sorted(bitrates, reverse=True):
+        if supports(bitrates[rate], snr):
+            return rate
+    return None
+
+
+def bit_loading(snr, cfg=None, sizes=(2, 4, 8, 16, 32, 64, 128, 256)):
+    """ Choose the largest supported constellation for each carrier,
+    dropping the carriers which cannot be used (e.g. near a notch).
+    Returns a configuration with per-carrier constellations,
+    or None if no carrier can be used.
+    """
+    cfg = config if cfg is None else cfg
+    carriers = []
+    npoints = []
+    for freq in cfg.frequencies:
+        supported = [n for n in sizes
+                     if snr.get(freq, -np.inf) >= required_snr(_config.qam(n))]
+        if supported:
+            carriers.append(float(freq))
+            npoints.append(max(supported))
+
+    if not carriers:
+        return None
+
+    return _config.Configuration(
+        Fs=cfg.Fs, Tsym=cfg.Tsym, Npoints=npoints, carriers=carriers)
+
+
+def report(result):
+    for freq, snr in sorted(result['snr'].items()):
+        log.info('%5.1f kHz: SNR = %5.2f dB', freq / 1e3, snr)
+    log.info('Drift: %+.2f ppm', result['drift'])
+
+    rate = recommend(result['snr'])
+    if rate is None:
+        log.warning('No bitrate is supported by the channel')
+    else:
+        log.info('Recommended bitrate: BITRATE=%d', rate)
+
+    loaded = bit_loading(result['snr'])
+    if loaded is not None:
+        npoints = [len(c) for c in loaded.constellations]
+        log.info('Bit loading: %.1f kb/s using Npoints=%s',
+                 loaded.modem_bps / 1e3, npoints)
+        dropped = set(result['snr']) - set(loaded.frequencies)
+        for freq in sorted(dropped):
+            log.info('Bit loading: %.1f kHz carrier is not used', freq / 1e3)
+    return rate
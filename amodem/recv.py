@@ -1,6 +1,7 @@
 import functools
 import itertools
 import logging
+import queue
 import time
 
 import numpy as np
@@ -9,30 +10,69 @@ from . import dsp
 from . import common
 from . import framing
 from . import equalizer
+from . import workers
 
 log = logging.getLogger(__name__)
 
 
 class Receiver:
 
-    def __init__(self, config, pylab=None):
+    def __init__(self, config, pylab=None, pipeline=False):
         self.stats = {}
         self.plt = pylab
-        self.modem = dsp.MODEM(config.symbols)
+        self.modems = dsp.modems(config.constellations)
+        self.pilot = config.carrier_index if config.pilot else None
+        self.pilot_symbol = config.pilot_symbol
+        self.carrier_groups = _carrier_groups(self.modems, skip=self.pilot)
         self.frequencies = np.array(config.frequencies)
         self.omegas = 2 * np.pi * self.frequencies / config.Fs
         self.Nsym = config.Nsym
+        self.demux_filters = dsp.demux_filters(self.omegas, self.Nsym)
         self.Tsym = config.Tsym
-        self.iters_per_update = 100  # [ms]
-        self.iters_per_report = 1000  # [ms]
+        self.guard_length = config.guard_length
+        # demux window advance into the cyclic prefix, so a small timing
+        # error doesn't cause inter-symbol interference [samples]
+        self.guard_margin = min(4, self.guard_length // 4)
+        self.symbol_time = config.symbol_length / config.Fs  # [seconds]
+        self.iters_per_update = 100  # [symbols]
+        self.iters_per_report = 1000  # [symbols]
         self.modem_bitrate = config.modem_bps
         self.equalizer = equalizer.Equalizer(config)
         self.carrier_index = config.carrier_index
         self.output_size = 0  # number of bytes written to output stream
+        self.training_snr = None  # per-carrier SNR [dB], measured in training
+        self.noise_var = None  # per-carrier noise variance (for soft output)
+        self.carrier_gains = None  # one-tap equalizer (using cyclic prefix)
+        self.noise_gain = 0.1  # noise variance averaging factor (per block)
         self.freq_err_gain = 0.01 * self.Tsym  # integration feedback gain
+        self.pipeline = pipeline  # demux and decode on separate threads
+        self.block_size = 10  # [symbols] decoded at once
+        if self.pilot is not None:
+            # the pilot's phase is tracked (by a PI loop) after each block,
+            # so the block size sets the loop's update interval
+            self.block_size = self.iters_per_update = config.pilot_interval
+            self.pll_gain = 0.5  # proportional feedback gain
+            self.freq_err_gain = self.pll_gain / (
+                4 * self.block_size * config.symbol_length)  # integration
+            self.pilot_period = config.Fs / config.frequencies[self.pilot]
+        self.queue_size = 4  # [blocks] maximal pipeline stage backlog
+        self.prefix = config.prefix
+        self.training_length = config.training_length
+        self.silence_length = config.silence_length
+        self.start_symbols = (len(self.prefix) +  # consumed by start()
+                              self.training_length + 2 * self.silence_length)
+
+    def reset(self):
+        """ Prepare for a new transmission (keeping the precomputed tables).
+        """
+        self.stats = {}
+        self.output_size = 0
+        self.training_snr = None
+        self.noise_var = None
+        self.carrier_gains = None
 
     def _prefix(self, symbols, gain=1.0):
-        S = common.take(symbols, len(equalizer.prefix))
+        S = common.take(symbols, len(self.prefix))
         S = S[:, self.carrier_index] * gain
         sliced = np.round(np.abs(S))
         self.plt.figure()
@@ -42,20 +82,20 @@ class Receiver:
         bits = np.array(sliced, dtype=int)
         self.plt.subplot(1, 2, 2)
         self.plt.plot(np.abs(S))
-        self.plt.plot(equalizer.prefix)
-        errors = bits != equalizer.prefix
+        self.plt.plot(self.prefix)
+        errors = bits != self.prefix
         if any(errors):
             msg = f'Incorrect prefix: {sum(errors)} errors'
             raise ValueError(msg)
         log.debug('Prefix OK')
 
     def _train(self, sampler, order, lookahead):
-        equalizer_length = equalizer.equalizer_length
+        equalizer_length = self.training_length
         train_symbols = self.equalizer.train_symbols(equalizer_length)
-        train_signal = (self.equalizer.modulator(train_symbols) *
+        train_signal = (self.equalizer.train_signal(equalizer_length) *
                         len(self.frequencies))
 
-        prefix = postfix = equalizer.silence_length * self.Nsym
+        prefix = postfix = self.silence_length * self.Nsym
         signal_length = equalizer_length * self.Nsym + prefix + postfix
 
         signal = sampler.take(signal_length + lookahead)
@@ -74,12 +114,28 @@ class Receiver:
         # Pre-load equalization filter with the signal (+lookahead)
         equalized = list(equalization_filter(signal))
         equalized = equalized[prefix+lookahead:-postfix+lookahead]
-        self._verify_training(equalized, train_symbols)
+        symbols = self.equalizer.demodulator(equalized, self.training_length)
+        self._verify_training(symbols, train_symbols)
         return equalization_filter
 
-    def _verify_training(self, equalized, train_symbols):
-        equalizer_length = equalizer.equalizer_length
-        symbols = self.equalizer.demodulator(equalized, equalizer_length)
+    def _train_gains(self, symbols):
+        """ Estimate each carrier's gain from the training symbols (which
+        are sent with a cyclic prefix, so the echoes shorter than the guard
+        interval cause no inter-symbol interference). """
+        train_symbols = self.equalizer.train_symbols(self.training_length)
+        common.take(symbols, self.silence_length)
+        self._set_guard(symbols)
+        received = common.take(symbols, self.training_length)
+        symbols.guard = symbols.margin = 0
+        common.take(symbols, self.silence_length)
+
+        gains = (np.sum(received * train_symbols.conj(), axis=0) /
+                 np.sum(np.abs(train_symbols) ** 2, axis=0))
+        self.carrier_gains = gains
+        log.debug('Training completed')
+        self._verify_training(received / gains, train_symbols)
+
+    def _verify_training(self, symbols, train_symbols):
         sliced = np.array(symbols).round()
         errors = np.array(sliced - train_symbols, dtype=bool)
         error_rate = errors.sum() / errors.size
@@ -89,6 +145,8 @@ class Receiver:
         noise_rms = dsp.rms(errors)
         signal_rms = dsp.rms(train_symbols)
         SNRs = 20.0 * np.log10(signal_rms / noise_rms)
+        self.training_snr = SNRs
+        self.noise_var = noise_rms ** 2
 
         self.plt.figure()
         for (i, freq), snr in zip(enumerate(self.frequencies), SNRs):
@@ -98,57 +156,142 @@ class Receiver:
         assert error_rate == 0, error_rate
         log.debug('Training verified')
 
-    def _bitstream(self, symbols, error_handler):
-        streams = []
-        symbol_list = []
-        generators = common.split(symbols, n=len(self.omegas))
-        for freq, S in zip(self.frequencies, generators):
-            equalized = []
-            S = common.icapture(S, result=equalized)
-            symbol_list.append(equalized)
-
-            freq_handler = functools.partial(error_handler, freq=freq)
-            bits = self.modem.decode(S, freq_handler)  # list of bit tuples
-            streams.append(bits)  # bit stream per frequency
-
-        return zip(*streams), symbol_list
-
-    def _demodulate(self, sampler, symbols):
+    def _decode(self, block):
+        """ Decode a block of symbols (with a column per carrier),
+        returning the decoded symbols and the received bits. """
+        decoded = np.empty_like(block)
+        bits = [np.zeros((len(block), 0), dtype=int)] * len(self.frequencies)
+        if self.pilot is not None:  # known symbol, carrying no data
+            decoded[:, self.pilot] = self.pilot_symbol
+        for modem, carriers in self.carrier_groups:
+            decoded[:, carriers], group_bits = modem.decode_block(
+                block[:, carriers])
+            for i, carrier in enumerate(carriers):
+                bits[carrier] = group_bits[:, i]
+        return decoded, np.concatenate(bits, axis=1).ravel()
+
+    def _llrs(self, block):
+        """ Soft decoding of a block of symbols, returning the bits' LLRs
+        (in the same order as the bits returned by `_decode()`). """
+        llrs = [np.zeros((len(block), 0))] * len(self.frequencies)
+        for modem, carriers in self.carrier_groups:
+            group_llrs = modem.llr_block(block[:, carriers],
+                                         self.noise_var[carriers])
+            for i, carrier in enumerate(carriers):
+                llrs[carrier] = group_llrs[:, i]
+        return np.concatenate(llrs, axis=1).ravel()
+
+    def _update_noise(self, noise):
+        """ Track the per-carrier noise variance of the decoded symbols. """
+        noise_var = np.mean(np.abs(noise) ** 2, axis=0)
+        if self.noise_var is None:
+            self.noise_var = noise_var
+        else:
+            self.noise_var += self.noise_gain * (noise_var - self.noise_var)
+
+    def _demodulate(self, sampler, blocks, correct=None, soft=False):
+        if correct is None:
+            correct = functools.partial(self._correct_sampler, sampler)
         symbol_list = []
-        errors = {}
-        noise = {}
-
-        def _handler(received, decoded, freq):
-            errors.setdefault(freq, []).append(received / decoded)
-            noise.setdefault(freq, []).append(received - decoded)
+        errors = []
+        noise = []
 
-        stream, symbol_list = self._bitstream(symbols, _handler)
         self.stats['symbol_list'] = symbol_list
         self.stats['rx_bits'] = 0
         self.stats['rx_start'] = time.time()
+        self.stats['rx_symbols'] = 0
 
         log.info('Starting demodulation')
-        for i, block_of_bits in enumerate(stream, 1):
-            for bits in block_of_bits:
-                self.stats['rx_bits'] = self.stats['rx_bits'] + len(bits)
-                yield bits
-
-            if i % self.iters_per_update == 0:
-                self._update_sampler(errors, sampler)
-
-            if i % self.iters_per_report == 0:
+        count = 0
+        for block in blocks:
+            if self.carrier_gains is not None:
+                block = block / self.carrier_gains
+            decoded, bits = self._decode(block)
+            symbol_list.append(block)
+            errors.append(block / decoded)
+            noise.append(block - decoded)
+            self._update_stats(noise[-1], sampler)
+
+            self.stats['rx_bits'] = self.stats['rx_bits'] + len(bits)
+            if soft:
+                yield self._llrs(block)  # using the preceding noise estimate
+            else:
+                yield bits.tolist()
+            self._update_noise(noise[-1])
+
+            # block size divides the update interval
+            count += len(block)
+            if count % self.iters_per_update == 0:
+                correct(self._timing_error(errors))
+
+            if count // self.iters_per_report > \
+                    (count - len(block)) // self.iters_per_report:
                 self._report_progress(noise, sampler)
 
-    def _update_sampler(self, errors, sampler):
-        err = np.array([e for v in errors.values() for e in v])
+    def _update_stats(self, noise, sampler):
+        self.stats['rx_symbols'] += len(noise)
+        self.stats['snr'] = -10 * np.log10(np.mean(np.abs(noise) ** 2))
+        self.stats['drift'] = (1.0 - sampler.freq) * 1e6
+
+    def live_stats(self):
+        """ Current demodulation statistics:
+        SNR [dB] of the last decoded symbols, sampling drift [ppm],
+        and the demodulated audio duration [seconds].
+        """
+        return {
+            'snr': self.stats.get('snr'),
+            'drift': self.stats.get('drift'),
+            'time': self.stats.get('rx_symbols', 0) * self.symbol_time,
+        }
+
+    def _timing_error(self, errors):
+        if self.pilot is not None:
+            return self._pilot_error(errors)
+        err = np.concatenate(errors).ravel() if errors else np.array([])
         err = np.mean(np.angle(err))/(2*np.pi) if err.size else 0
         errors.clear()
+        return err
+
+    def _pilot_error(self, errors):
+        """ Estimate the timing error [samples] from the pilot's phase,
+        scaled by the PLL's proportional gain. """
+        if not errors:
+            return 0
+        err = np.concatenate(errors)[:, self.pilot]
+        errors.clear()
+        phase = np.angle(np.mean(err)) / (2 * np.pi)  # [cycles]
+        return self.pll_gain * phase * self.pilot_period
 
+    def _correct_sampler(self, sampler, err):
         sampler.freq -= self.freq_err_gain * err
         sampler.offset -= err
 
+    def _blocks(self, sampler, symbols, corrections):
+        while True:
+            # the sampler is adjusted only by the demux thread
+            while not corrections.empty():
+                self._correct_sampler(sampler, corrections.get())
+            block = common.take(symbols, self.block_size)
+            if not block.size:
+                return
+            yield block
+
+    def _pipeline(self, sampler, symbols, soft=False):
+        """ Demux and decode the symbols on separate threads.
+        The decoded timing errors are fed back to the sampler within
+        (queue_size + 2) blocks, instead of being applied immediately.
+        """
+        corrections = queue.Queue()
+        blocks = workers.background(
+            self._blocks(sampler, symbols, corrections),
+            maxsize=self.queue_size, name='Demux')
+        bitstream = self._demodulate(sampler, blocks,
+                                     correct=corrections.put, soft=soft)
+        return workers.background(
+            bitstream, maxsize=self.queue_size, name='Decode')
+
     def _report_progress(self, noise, sampler):
-        e = np.array([e for v in noise.values() for e in v])
+        e = np.concatenate(noise)
         noise.clear()
         log.debug(
             'Got  %10.3f kB, SNR: %5.2f dB, drift: %+5.2f ppm',
@@ -157,20 +300,52 @@ class Receiver:
             (1.0 - sampler.freq) * 1e6
         )
 
-    def run(self, sampler, gain, output):
-        log.debug('Receiving')
-        symbols = dsp.Demux(sampler, omegas=self.omegas, Nsym=self.Nsym)
+    def start(self, sampler, gain):
+        """ Receive the prefix and train the equalizer (or the carriers'
+        gains, when the symbols have a cyclic prefix). """
+        symbols = dsp.Demux(sampler, omegas=self.omegas, Nsym=self.Nsym,
+                            filters=self.demux_filters)
         self._prefix(symbols, gain=gain)
 
-        filt = self._train(sampler, order=10, lookahead=10)
-        sampler.equalizer = lambda x: list(filt(x))
-
-        bitstream = self._demodulate(sampler, symbols)
-        bitstream = itertools.chain.from_iterable(bitstream)
+        if self.guard_length:  # cheaper (per-carrier) equalization
+            self._train_gains(symbols)
+        else:
+            filt = self._train(sampler, order=10, lookahead=10)
+            sampler.equalizer = lambda x: list(filt(x))
+        self._set_guard(symbols)  # for the data symbols
+        return symbols
+
+    def _set_guard(self, symbols):
+        symbols.guard = self.guard_length
+        symbols.margin = self.guard_margin
+
+    def bitstream(self, sampler, symbols, soft=False):
+        """ Demodulate the symbols, yielding a list of bits per block.
+        For soft output, an array of the bits' log-likelihood ratios is
+        yielded instead (positive values favor 0 bits), e.g. for a
+        soft-decision FEC decoder.
+        """
+        if self.pipeline:
+            return self._pipeline(sampler, symbols, soft=soft)
+        blocks = common.iterate(symbols, size=self.block_size, truncate=False)
+        return self._demodulate(sampler, blocks, soft=soft)
+
+    def frames(self, sampler, gain):
+        """ Receive the data, yielding each frame once it is verified. """
+        log.debug('Receiving')
+        symbols = self.start(sampler, gain=gain)
+        bitstream = self.bitstream(sampler, symbols)
+        try:
+            bits = itertools.chain.from_iterable(bitstream)
+            for frame in framing.decode_frames(bits):
+                self.output_size += len(frame)
+                yield frame
+        finally:
+            bitstream.close()  # stop the pipeline threads (if running)
 
-        for frame in framing.decode_frames(bitstream):
+    def run(self, sampler, gain, output):
+        for frame in self.frames(sampler, gain):
             output.write(frame)
-            self.output_size += len(frame)
 
     def report(self):
         if self.stats:
@@ -185,9 +360,10 @@ class Receiver:
                      self.output_size * 1e-3 / duration)
 
             self.plt.figure()
-            symbol_list = np.array(self.stats['symbol_list'])
+            symbols = np.zeros((0, len(self.frequencies)))
+            symbols = np.concatenate([symbols] + self.stats['symbol_list'])
             for i, freq in enumerate(self.frequencies):
-                self._constellation(symbol_list[i], self.modem.symbols,
+                self._constellation(symbols[:, i], self.modems[i].symbols,
                                     f'$F_c = {freq} Hz$', index=i)
         self.plt.show()
 
@@ -208,3 +384,16 @@ class Receiver:
         self.plt.axis('equal')
         self.plt.axis(np.array([-1, 1, -1, 1])*1.1)
         self.plt.title(title)
+
+
+def _carrier_groups(modems, skip=None):
+    """ Group the carriers by their constellations (for vectorized decoding).
+    Returns a list of (MODEM, carrier indices) pairs, without the `skip`
+    carrier (e.g. the pilot).
+    """
+    groups = {}
+    for index, modem in enumerate(modems):  # identical MODEMs are shared
+        if index == skip:
+            continue
+        groups.setdefault(id(modem), (modem, []))[1].append(index)
+    return list(groups.values())
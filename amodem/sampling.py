@@ -3,6 +3,7 @@ import itertools
 import numpy as np
 
 from . import common
+from . import kernels
 
 
 class Interpolator:
@@ -28,12 +29,15 @@ class Interpolator:
 
         assert set(lengths) == set([self.coeff_len])  # verify same lengths
         assert len(self.filt) == resolution
+        self.filt = np.array(self.filt)
 
 
 defaultInterpolator = Interpolator()
 
 
 class Sampler:
+    max_chunk = 1024  # maximal number of samples to interpolate at once
+
     def __init__(self, src, interp=None, freq=1.0):
         self.freq = freq
         self.equalizer = lambda x: x  # LTI equalization filter
@@ -60,29 +64,41 @@ class Sampler:
     def _take(self, size):
         frame = np.zeros(size)
         count = 0
-        for frame_index in range(size):
-            offset = self.offset
-            # offset = k + (j / self.resolution)
-            k = int(offset)  # integer part
-            j = int((offset - k) * self.resolution)  # fractional part
-            coeffs = self.filt[j]  # choose correct filter phase
-            end = k + self.width
-            # process input until all buffer is full with samples
-            try:
-                while self.index < end:
-                    self.buff[:-1] = self.buff[1:]
-                    self.buff[-1] = next(self.src)  # throws StopIteration
-                    self.index += 1
-            except StopIteration:
-                break
-
-            self.offset += self.freq
-            # apply interpolation filter
-            frame[frame_index] = np.dot(coeffs, self.buff)
-            count = frame_index + 1
+        while count < size:
+            n = self._interpolate(frame[count:count+self.max_chunk])
+            count += n
+            if n < self.max_chunk:
+                break  # no more input samples
 
         return self.equalizer(frame[:count])
 
+    def _interpolate(self, frame):
+        size = len(frame)
+        # accumulate the offsets, exactly as `self.offset += self.freq`
+        offsets = np.full(size + 1, self.freq)
+        offsets[0] = self.offset
+        offsets = np.add.accumulate(offsets)
+        # offset = k + (j / self.resolution)
+        k = offsets[:-1].astype(int)  # integer part
+        j = ((offsets[:-1] - k) * self.resolution).astype(int)  # fractional
+
+        # process input until all buffer is full with samples
+        ends = np.maximum.accumulate(np.maximum(k + self.width, self.index))
+        count = int(ends[-1]) - self.index
+        samples = np.fromiter(itertools.islice(self.src, count), dtype=float)
+        buff = np.concatenate([self.buff, samples])
+        index = self.index + len(samples)
+        size = np.searchsorted(ends, index, side='right')  # available
+
+        # apply interpolation filters (choosing the correct filter phase)
+        frame[:size] = kernels.interpolate(
+            self.filt, buff, ends[:size] - self.index, j[:size])
+
+        self.buff = buff[len(samples):]
+        self.index = index
+        self.offset = offsets[size]
+        return size
+
 
 def resample(src, dst, df=0.0):
     x = common.load(src)
@@ -1,3 +1,4 @@
+import functools
 import itertools
 import logging
 
@@ -11,40 +12,98 @@ log = logging.getLogger(__name__)
 
 
 class Sender:
+    """ Modulate the data into audio, written into `fd`.
+    The audio is buffered (and written in blocks of the configured latency),
+    so the last samples are written only by `flush()` - which is also
+    called by `close()` and when leaving a `with` block.
+    """
+
     def __init__(self, fd, config, gain=1.0):
         self.gain = gain
         self.offset = 0
         self.fd = fd
-        self.modem = dsp.MODEM(config.symbols)
-        self.carriers = config.carriers / config.Nfreq
-        self.pilot = config.carriers[config.carrier_index]
-        self.silence = np.zeros(equalizer.silence_length * config.Nsym)
+        # write a few large blocks per second (instead of one per symbol)
+        self.writer = common.Writer(fd, size=int(config.latency * config.Fs))
+        self.config = config
+        self.modems = dsp.modems(config.constellations)
+        self.modulate_symbol = dsp.Modulator(
+            2 * np.pi * np.array(config.frequencies) / config.Fs, config.Nsym,
+            gain=1.0 / config.Nfreq)
         self.iters_per_report = config.baud  # report once per second
-        self.padding = [0] * config.bits_per_baud
-        self.equalizer = equalizer.Equalizer(config)
+        self.bits_per_baud = config.bits_per_baud
+        self.padding = [0] * self.bits_per_baud
+        self.pilot = config.carrier_index if config.pilot else None
+        self.pilot_symbol = config.pilot_symbol
+        self.guard_length = config.guard_length
+
+    def reset(self, fd):
+        """ Start a new transmission into `fd`. """
+        self.flush()
+        self.fd = self.writer.fd = fd
+        self.offset = 0
 
     def write(self, sym):
         sym = np.array(sym) * self.gain
-        data = common.dumps(sym)
-        self.fd.write(data)
+        self.writer.write(sym)
         self.offset += len(sym)
 
+    def flush(self):
+        """ Write the buffered samples into `fd`. """
+        self.writer.flush()
+
+    def close(self):
+        """ Flush the buffered samples (without closing `fd`). """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     def start(self):
-        for value in equalizer.prefix:
-            self.write(self.pilot * value)
-
-        symbols = self.equalizer.train_symbols(equalizer.equalizer_length)
-        signal = self.equalizer.modulator(symbols)
-        self.write(self.silence)
-        self.write(signal)
-        self.write(self.silence)
-
-    def modulate(self, bits):
-        bits = itertools.chain(bits, self.padding)
-        Nfreq = len(self.carriers)
-        symbols_iter = common.iterate(self.modem.encode(bits), size=Nfreq)
-        for i, symbols in enumerate(symbols_iter, 1):
-            self.write(np.dot(symbols, self.carriers))
+        data = preamble(self.config, self.gain)
+        self.flush()
+        self.fd.write(data)
+        self.offset += len(data) // self.config.sample_size
+
+    def encode(self, bits):
+        """ Split the bits between the carriers, one symbol per carrier. """
+        for block in common.iterate(bits, self.bits_per_baud, tuple):
+            offset = 0
+            symbols = []
+            for i, modem in enumerate(self.modems):
+                if i == self.pilot:
+                    symbols.append(self.pilot_symbol)
+                    continue
+                size = modem.bits_per_symbol
+                symbols.append(modem.encode_map[block[offset:offset+size]])
+                offset += size
+            yield symbols
+
+    def modulate(self, bits, pad=True):
+        """ Modulate the bits, padding the last symbol with zeroes.
+        Without padding, the bits must fill complete symbols. """
+        if pad:
+            bits = itertools.chain(bits, self.padding)
+        for i, symbols in enumerate(self.encode(bits), 1):
+            signal = self.modulate_symbol(symbols)
+            if self.guard_length:  # cyclic prefix
+                signal = np.concatenate([signal[-self.guard_length:], signal])
+            self.write(signal)
             if i % self.iters_per_report == 0:
-                total_bits = i * Nfreq * self.modem.bits_per_symbol
+                total_bits = i * self.bits_per_baud
                 log.debug('Sent %10.3f kB', total_bits / 8e3)
+
+
+@functools.lru_cache(maxsize=16)
+def preamble(config, gain):
+    """ Render the pilot prefix and the training signal (framed by silence)
+    into audio data, which is cached per configuration and gain. """
+    pilot = config.carriers[config.carrier_index]
+    silence = np.zeros(config.silence_length * config.Nsym)
+    prefix = np.concatenate([pilot * value for value in config.prefix])
+    training = equalizer.Equalizer(config).train_signal(
+        config.training_length)
+    signal = np.concatenate([prefix, silence, training, silence])
+    return common.dumps(signal * gain)
@@ -1,3 +1,5 @@
+import queue
+import threading
 import time
 
 
@@ -44,6 +46,51 @@ class Reader:
     __next__ = next
 
 
+class Feed:
+    """ Read a live source (e.g. a pipe) on a separate thread, passing the
+    data to the caller as soon as it arrives. """
+
+    bufsize = Reader.bufsize
+
+    def __init__(self, fd):
+        self.chunks = queue.Queue()
+        self.total = 0
+        self.eof = False  # set when the source is closed
+        read = getattr(fd, 'read1', fd.read)  # don't wait for a full buffer
+        self.thread = threading.Thread(target=self._thread, args=(read,),
+                                       name='Feed', daemon=True)
+        self.thread.start()
+
+    def _thread(self, read):
+        try:
+            while True:
+                data = read(self.bufsize)
+                self.chunks.put(data)
+                if not data:
+                    return
+        except BaseException as e:  # pylint: disable=broad-except
+            self.chunks.put(e)
+
+    def read(self, timeout):
+        """ Return the data received so far, waiting up to `timeout` seconds
+        for it to arrive (an empty result means the source is idle). """
+        data = bytearray()
+        try:
+            chunk = self.chunks.get(timeout=timeout)
+            while True:
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                if not chunk:
+                    self.eof = True
+                    break
+                data.extend(chunk)
+                chunk = self.chunks.get_nowait()
+        except queue.Empty:
+            pass
+        self.total += len(data)
+        return bytes(data)
+
+
 class Dumper:
     def __init__(self, src, dst):
         self.src = src
@@ -0,0 +1,94 @@
+import asyncio
+from io import BytesIO
+import os
+import subprocess as sp
+import sys
+
+import pytest
+
+import amodem
+from .. import config, main
+
+config = config.bitrates[80]
+
+
+class Writer:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data.extend(data)
+
+    async def drain(self):
+        await asyncio.sleep(0)
+
+
+def _reader(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+async def _recv(reader):
+    if isinstance(reader, bytes):
+        reader = _reader(reader)
+    return b''.join([chunk async for chunk in amodem.arecv(config, reader)])
+
+
+@pytest.mark.parametrize('size', [0, 1, 250, 1234])
+def test_send(size):
+    data = os.urandom(size)
+    expected = BytesIO()
+    main.send(config, src=BytesIO(data), dst=expected)
+
+    async def run():
+        writer = Writer()
+        assert await amodem.asend(config, _reader(data), writer)
+        return bytes(writer.data)
+
+    assert asyncio.run(run()) == expected.getvalue()
+
+
+def test_recv():
+    data = os.urandom(1234)
+    audio = BytesIO()
+    main.send(config, src=BytesIO(data), dst=audio)
+    assert asyncio.run(_recv(audio.getvalue())) == data
+
+    with pytest.raises(ValueError):
+        asyncio.run(_recv(audio.getvalue()[:-64000]))
+    with pytest.raises(ValueError):
+        asyncio.run(_recv(bytes(64000)))
+
+
+def test_loopback():
+    payloads = [os.urandom(size) for size in (0, 100, 1000)]
+
+    async def session(data):
+        server_done = asyncio.get_running_loop().create_future()
+
+        async def handle(reader, writer):
+            server_done.set_result(await _recv(reader))
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            await amodem.asend(config, _reader(data), writer)
+            writer.close()
+            return await server_done
+
+    async def run():
+        return await asyncio.gather(*[session(data) for data in payloads])
+
+    assert asyncio.run(run()) == payloads
+
+
+def test_lazy_import():
+    script = 'import sys, amodem; assert "numpy" not in sys.modules'
+    sp.check_call([sys.executable, '-c', script])
+    assert amodem.asend is amodem.aio.asend
+    with pytest.raises(AttributeError):
+        amodem.foobar  # pylint: disable=pointless-statement
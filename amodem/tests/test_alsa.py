@@ -1,35 +1,70 @@
+from io import BytesIO
+
 import mock
+import pytest
 
 from .. import alsa, config
 
+args = ('-f S16_LE -c 1 -r 32000 -T 100 '
+        '--period-size=4000 --buffer-size=16000 -q -').split()
+
 
 def test_alsa():
     interface = alsa.Interface(config=config.fastest())
+    assert interface.chunk_size == 6400
     interface.launch = mock.Mock()
+    interface.launch.return_value.stdout.readinto.return_value = 1
+    interface.launch.return_value.stderr = BytesIO(
+        b'overrun!!! (at least 1.234 ms long)\n')
     with interface:
         r = interface.recorder()
-        r.read(2)
+        assert r.bufsize == 6400
+        assert r.read(2) == b'\x00'
+        buf = r.buf
+        assert r.read(3) == b'\x00'
+        assert r.buf is buf  # reused
         r.close()
+        assert r.xruns == 1
+
+    p = mock.call(args=['arecord'] + args, stdout=-1, stderr=-1)
+    assert interface.launch.mock_calls == [
+        p, p.stdout.readinto(bytearray(2)), p.stdout.readinto(bytearray(3)),
+        p.kill()
+    ]
 
-    p = mock.call(
-        args='arecord -f S16_LE -c 1 -r 32000 -T 100 -q -'.split(),
-        stdout=-1)
-    assert interface.launch.mock_calls == [p, p.stdout.read(2), p.kill()]
 
+def test_alsa_player():
+    interface = alsa.Interface(config=config.bitrates[80], buffer_size=2)
+    assert interface.period_size == 1
     interface.launch = mock.Mock()
+    interface.launch.return_value.stderr = BytesIO(
+        b'underrun!!! (at least 5.678 ms long)\nother message\n')
     with interface:
         p = interface.player()
-        p.write('\x00\x00')
+        for data in [b'\x00\x01', b'\x02\x03\x04', b'\x05']:
+            p.write(data)
         p.close()
+        assert p.xruns == 1
 
-    p = mock.call(
-        args='aplay -f S16_LE -c 1 -r 32000 -T 100 -q -'.split(),
-        stdin=-1)
+    p = mock.call(args=['aplay'] + args[:8] + [
+        '--period-size=1', '--buffer-size=2', '-q', '-'], stdin=-1, stderr=-1)
     assert interface.launch.mock_calls == [
-        p, p.stdin.write('\x00\x00'), p.stdin.close(), p.wait()
+        p, p.stdin.write(b'\x00\x01\x02\x03\x04'), p.stdin.write(b'\x05'),
+        p.stdin.close(), p.wait()
     ]
 
 
+def test_alsa_player_error():
+    interface = alsa.Interface(config=config.bitrates[80], buffer_size=1)
+    interface.launch = mock.Mock()
+    interface.launch.return_value.stderr = BytesIO()
+    interface.launch.return_value.stdin.write.side_effect = IOError('broken')
+    p = interface.player()
+    p.write(b'\x00\x00')
+    with pytest.raises(IOError):
+        p.close()
+
+
 def test_alsa_subprocess():
     interface = alsa.Interface(config=config.fastest())
     with mock.patch('subprocess.Popen') as popen:
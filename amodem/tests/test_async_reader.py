@@ -14,7 +14,7 @@ def test_async_reader():
     def _read(n):
         time.sleep(n * 0.1)
         return b'\x00' * n
-    s = mock.Mock()
+    s = mock.Mock(spec=['read', 'close'])
     s.read = _read
     r = async_reader.AsyncReader(s, 1)
 
@@ -31,3 +31,18 @@ def test_async_reader_error():
     r = async_reader.AsyncReader(s, 1)
     with pytest.raises(IOError):
         r.read(3)
+
+
+def test_async_reader_readinto():
+    data = iter([b'\x01\x02', b'\x03', b'\x04\x05'])
+
+    def _readinto(buf):
+        chunk = next(data, b'')
+        buf[:len(chunk)] = chunk
+        return len(chunk)
+    s = mock.Mock(spec=['readinto', 'close'])
+    s.readinto = _readinto
+    r = async_reader.AsyncReader(s, 2)
+    assert r.read(4) == b'\x01\x02\x03\x04'
+    assert r.read(1) == b'\x05'
+    r.close()
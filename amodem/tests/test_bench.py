@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+
+import numpy as np
+
+from .. import bench, channel, common, config, main
+
+
+def test_run():
+    points = [(48, 40, 0), (48, 40, 30), (48, 10, 0), (48, 10, 30)]
+    rows = bench.run(points, size=300, jobs=1)
+    assert [(r['snr'], r['drift']) for r in rows] == [
+        (40, 0), (40, 30), (10, 0), (10, 30)]
+    for row in rows[:2]:
+        assert row['ser'] == row['fer'] == 0
+        assert row['goodput'] > 0
+    for row in rows[2:]:
+        assert row['ser'] > 0.1
+        assert row['fer'] == 1
+        assert row['goodput'] == 0
+
+    # results are reproducible (using worker processes)
+    assert bench.run(points, size=300, jobs=2) == rows
+
+
+def test_write():
+    rows = bench.run([(1, 30, 10)], size=10, trials=2, jobs=1)
+    assert rows[0]['trials'] == 2
+
+    f = io.StringIO()
+    bench.write(rows, f, fmt='json')
+    assert json.loads(f.getvalue()) == rows
+
+    f = io.StringIO()
+    bench.write(rows, f, fmt='csv')
+    result, = csv.DictReader(io.StringIO(f.getvalue()))
+    assert list(result) == bench.fields
+    assert float(result['goodput']) == rows[0]['goodput']
+
+
+def test_data_power():
+    session = main.Session(config.bitrates[80], gain=0.5)
+    data = np.random.RandomState(0).bytes(500)
+    signal, rx_audio = bench.transmit(session, data, snr=20, seed=0)
+    power = bench.data_power(session, signal)
+    # the preamble is louder than the modulated data
+    assert channel.signal_power(signal) > 5 * power
+
+    noise = common.loads(rx_audio.getvalue())[:len(signal)] - signal
+    assert abs(10 * np.log10(power / np.mean(noise ** 2)) - 20) < 0.2
@@ -1,11 +1,13 @@
 from io import BytesIO
+import json
 import random
 
 import mock
 import numpy as np
 import pytest
 
-from .. import calib, common, config
+from .. import calib, channel, common, config
+from .. import config as _config
 
 
 config = config.fastest()
@@ -129,11 +131,12 @@ def test_send_max_volume():
     assert check_call.mock_calls == [mock.call(shell=True, args='ctl 100%')]
 
 
-def test_recv_binary_search():
+def test_recv_gain_search():
     buf = BytesIO()
-    gains = [0.5, 0.25, 0.38, 0.44, 0.41, 0.39, 0.40, 0.40]
-    for gain in gains:
-        calib.send(config, buf, gain=gain, limit=2)
+    attenuation = 0.5  # between the volume level and the received signal
+    levels = [0.5, 0.8, 0.8, 0.8]  # converging to 0.4 received signal
+    for level in levels:
+        calib.send(config, buf, gain=level * attenuation, limit=1)
     buf.seek(0)
 
     dump = BytesIO()
@@ -141,19 +144,66 @@ def test_recv_binary_search():
         calib.recv(config, src=buf, volume_cmd='ctl', dump_audio=dump)
     assert dump.getvalue() == buf.getvalue()
 
-    gains.append(gains[-1])
+    levels.append(levels[-1])
     fmt = 'ctl {0:.0f}%'
-    expected = [mock.call(shell=True, args=fmt.format(100 * g)) for g in gains]
+    expected = [mock.call(shell=True, args=fmt.format(100 * level))
+                for level in levels]
     assert check_call.mock_calls == expected
 
 
+def test_volume_limits():
+    results = [{'total': 0.0, 'peak': 0.0}, {'total': 0.6, 'peak': 1.0}]
+    levels = []
+    for _ in calib.volume_calibration(iter(results), levels.append,
+                                      iters_per_update=1):
+        pass
+    assert levels == [0.5, 1.0, 0.5]  # weak, and then clipped
+
+
 def test_recv_freq_change():
     p = ProcessMock()
     calib.send(config, p, gain=0.5, limit=2)
     offset = p.buf.tell() // 16
     p.buf.seek(offset)
     messages = [state['msg'] for state in calib.recv_iter(config, p)]
-    assert messages == [
-        'good signal', 'good signal', 'good signal',
-        'frequency change',
-        'good signal', 'good signal', 'good signal']
+    assert messages == (['good signal'] * 16 + ['frequency change'] +
+                        ['good signal'] * 18)
+
+
+def test_multitone():
+    signal, sent = calib.multitone_signal(config, gain=0.5)
+    assert len(signal) == config.Nsym
+    assert abs(np.max(np.abs(signal)) - 0.5) < 1e-12
+    assert np.allclose(np.abs(sent), np.abs(sent[0]))
+
+    p = ProcessMock()
+    calib.send_multitone(config, p, gain=0.5, limit=3)
+    assert p.buf.tell() == 3 * config.Fs * p.bytes_per_sample
+    taps = [0.8, 0.0, 0.0, 0.2]
+    chan = channel.Channel(
+        channel.Multipath(taps), channel.Drift(ppm=50),
+        channel.Noise(snr=40, power=0.05, seed=0))
+    received = chan.apply(common.loads(p.buf.getvalue()[1234:]))
+
+    dst = BytesIO()
+    profile = calib.recv_multitone(config, BytesIO(common.dumps(received)),
+                                   dst=dst)
+    assert json.loads(dst.getvalue()) == profile
+    assert abs(profile['drift'] - 50) < 1
+
+    omegas = 2 * np.pi * np.array(config.frequencies) / config.Fs
+    response = np.polyval(taps[::-1], np.exp(1j * omegas))
+    gains = [c['gain'] for c in profile['carriers']]
+    assert np.max(np.abs(gains - 0.5 * np.abs(response))) < 1e-2
+    assert all(c['snr'] > 30 for c in profile['carriers'])
+
+    assert profile['bitrate'] == 80
+    cfg = _config.validate(profile['profile'])
+    assert list(cfg.frequencies) == list(config.frequencies)
+
+
+def test_multitone_weak():
+    p = ProcessMock()
+    calib.send_multitone(config, p, gain=0.01, limit=2)
+    p.buf.seek(0)
+    assert calib.recv_multitone(config, p) is None
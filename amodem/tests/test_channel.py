@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from .. import channel
+
+r = np.random.RandomState(seed=0)
+x = r.uniform(-1, 1, size=10000)
+
+
+def _chunked(impairments, sizes):
+    offsets = np.cumsum([0] + list(sizes))
+    chunks = [x[i:j] for i, j in zip(offsets[:-1], offsets[1:])]
+    return np.concatenate(list(channel.Channel(*impairments)(chunks)))
+
+
+@pytest.mark.parametrize('create', [
+    lambda: [channel.Noise(snr=10, power=1.0, seed=1)],
+    lambda: [channel.Multipath([1, 0, 0.5, -0.2])],
+    lambda: [channel.Gain(0.5, steps=[(3000, 0.1), (1000, 2.0)])],
+    lambda: [channel.Clip(0.5)],
+    lambda: [channel.Dropouts(rate=1e-3, length=100, seed=1)],
+    lambda: [channel.Multipath([0.5, 0.5]), channel.Clip(0.4),
+             channel.Noise(snr=20, power=0.1, seed=2)],
+])
+def test_streaming(create):
+    expected = channel.Channel(*create()).apply(x)
+    assert len(expected) == len(x)
+    for sizes in [[len(x)], [1, 2, 3, 5000, 0, 4994], [7] * 1428 + [4]]:
+        assert np.array_equal(_chunked(create(), sizes), expected)
+
+
+def test_noise():
+    y = channel.Channel(channel.Noise(snr=20, power=0.5, seed=0)).apply(
+        np.zeros(100000))
+    assert abs(10 * np.log10(0.5 / np.mean(y ** 2)) - 20) < 0.1
+
+
+def test_multipath():
+    taps = [1, 0, 0, 0.3]
+    y = channel.Channel(channel.Multipath(taps)).apply(x)
+    assert np.allclose(y, np.convolve(x, taps)[:len(x)])
+
+
+def test_gain():
+    g = channel.Gain(2.0, steps=[(5, 0.5)])
+    y = channel.Channel(g).apply(np.ones(10))
+    assert list(y) == [2.0] * 5 + [0.5] * 5
+
+
+def test_clip():
+    y = channel.Channel(channel.Clip(0.5)).apply(x)
+    assert np.max(np.abs(y)) == 0.5
+    assert np.array_equal(y[np.abs(x) < 0.5], x[np.abs(x) < 0.5])
+
+
+def test_dropouts():
+    d = channel.Dropouts(rate=1e-3, length=50, seed=0)
+    y = channel.Channel(d).apply(np.ones(100000))
+    dropped = np.mean(y == 0)
+    assert 0.02 < dropped < 0.08  # ~(1 - exp(-0.05))
+    assert set(y) == {0.0, 1.0}
+
+
+def test_drift():
+    ppm = 100
+    t = np.arange(100000)
+    y = channel.Channel(channel.Drift(ppm)).apply(np.sin(2e-3 * t))
+    assert abs(len(y) - len(t) / (1 + ppm * 1e-6)) < 200
+    # the sampling clock is faster than the sender's clock
+    expected = np.sin(2e-3 * t[:len(y)] * (1 + ppm * 1e-6))
+    assert np.max(np.abs(y[1000:-1000] - expected[1000:-1000])) < 1e-3
+
+
+def test_signal_power():
+    assert channel.signal_power(np.zeros(10)) == 0
+    assert channel.signal_power([0, 0, 2, -2, 0]) == 4
+
+
+def test_impairment():
+    with pytest.raises(TypeError):
+        channel.Impairment()  # pylint: disable=abstract-class-instantiated
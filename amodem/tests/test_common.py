@@ -1,3 +1,5 @@
+from io import BytesIO
+
 import numpy as np
 
 from .. import common, config
@@ -48,6 +50,18 @@ def test_dumps_loads():
     assert all(x == y)
 
 
+def test_writer():
+    x = np.random.RandomState(0).uniform(-1, 1, size=1000)
+    f = BytesIO()
+    writer = common.Writer(f, size=300)
+    for i, j in [(0, 10), (10, 10), (10, 700), (700, 1000)]:
+        writer.write(x[i:j] + 0j)
+    assert len(f.getvalue()) == 900 * 2  # full buffers only
+    writer.flush()
+    writer.flush()
+    assert f.getvalue() == common.dumps(x)
+
+
 def test_configs():
     default = config.Configuration()
     fastest = config.fastest()
@@ -0,0 +1,62 @@
+from io import BytesIO
+import os
+
+import pytest
+
+from .. import compress
+
+
+@pytest.fixture(params=sorted(compress.codecs))
+def codec(request):
+    return request.param
+
+
+@pytest.fixture(params=[b'', b'abc', os.urandom(1000), b'\x00' * 100000])
+def data(request):
+    return request.param
+
+
+def roundtrip(data, codec, level=None, chunk=100):
+    c = compress.Compressor(BytesIO(data), codec=codec, level=level)
+    dst = BytesIO()
+    d = compress.Decompressor(dst)
+    while True:
+        buf = c.read(chunk)
+        if not buf:
+            break
+        for i in range(0, len(buf), 3):  # detection should handle short writes
+            d.write(bytearray(buf[i:i+3]))
+    d.flush()
+    return dst.getvalue()
+
+
+def test_roundtrip(codec, data):
+    assert roundtrip(data, codec) == data
+
+
+def test_levels():
+    data = b'0123456789' * 1000
+    for level in (1, 9):
+        assert roundtrip(data, 'zlib', level=level) == data
+        assert roundtrip(data, 'bz2', level=level) == data
+    assert roundtrip(data, 'lzma', level=0) == data
+
+    for codec, level in [('zlib', 10), ('bz2', 0), ('lzma', -1)]:
+        with pytest.raises(ValueError):
+            compress.Compressor(BytesIO(data), codec=codec, level=level)
+
+
+def test_detect(codec):
+    obj = compress.codecs[codec].compressobj(None)
+    data = obj.compress(b'x' * 100) + obj.flush()
+    assert compress.detect(data).name == codec
+
+    with pytest.raises(ValueError):
+        compress.detect(b'\x00' * 16)
+
+
+def test_empty():
+    dst = BytesIO()
+    d = compress.Decompressor(dst)
+    d.flush()
+    assert dst.getvalue() == b''
@@ -1,3 +1,5 @@
+import pytest
+
 from .. import config
 
 
@@ -10,3 +12,113 @@ def test_slowest():
     c = config.slowest()
     assert c.Npoints == 2
     assert list(c.symbols) == [-1j, 1j]
+
+
+def test_fastest():
+    assert config.fastest() is config.bitrates[80]
+    assert config.fastest(Fs=48e3) is config.bitrates[144]
+    assert config.fastest(Fs=96e3) is config.bitrates[160]
+
+
+def test_replace():
+    base = config.Configuration(Fs=8e3, Npoints=16, frequencies=[1e3, 3e3],
+                                guard_length=2)
+    c = base.replace(pilot=True)
+    assert c.pilot and not base.pilot
+    assert c.guard_length == 2 and len(c.symbols) == 16
+    assert list(c.frequencies) == list(base.frequencies)
+
+    c = base.replace(carriers=[1e3, 3e3])
+    assert list(c.frequencies) == [1e3, 3e3]
+    c = c.replace(frequencies=[1e3, 2e3])
+    assert list(c.frequencies) == [1e3, 2e3]
+    assert c.replace(Npoints=4).guard_length == 2
+
+
+def test_bit_loading():
+    c = config.Configuration(Fs=8e3, Npoints=[16, 2], frequencies=[1e3, 2e3])
+    assert c.modem_bps == 5000
+    assert [len(s) for s in c.constellations] == [16, 2]
+    assert list(c.constellations[1]) == [-1j, 1j]
+    assert len(c.symbols) == 16
+
+
+def test_explicit_carriers():
+    c = config.Configuration(Fs=16e3, frequencies=[1e3, 3e3, 4e3])
+    assert list(c.frequencies) == [1e3, 3e3, 4e3]
+    assert c.Nfreq == 3
+
+    c = config.Configuration(Fs=16e3, carriers=[1e3, 3e3])
+    assert list(c.frequencies) == [1e3, 3e3]  # not a [first, last] range
+
+
+def test_validate():
+    c = config.validate({'Fs': 48000, 'Npoints': 16,
+                         'carriers': [1000, 5000, 20000], 'gain': 0.5})
+    assert list(c.frequencies) == [1e3, 5e3, 20e3]
+    assert c.modem_bps == 12000
+    assert c.gain == 0.5
+
+    c = config.validate({'Fs': 8000, 'frequencies': [1000, 3000]})
+    assert list(c.frequencies) == [1e3, 2e3, 3e3]
+
+    c = config.validate({'Fs': 8000, 'carriers': [1000, 3000]})
+    assert list(c.frequencies) == [1e3, 3e3]
+
+    c = config.validate({'prefix_length': 40, 'silence_length': 5})
+    assert c.prefix == [1] * 40 + [0] * 5
+    assert c.training_length == 200
+
+    c = config.validate({'Fs': 8000, 'Npoints': 16, 'pilot': True,
+                         'frequencies': [1000, 3000]})
+    assert c.pilot and c.modem_bps == 8000  # no data over the pilot
+
+    c = config.validate({'Fs': 8000, 'Npoints': 16, 'guard_length': 2,
+                         'frequencies': [1000, 3000]})
+    assert c.symbol_length == 10 and c.modem_bps == 9600
+
+    invalid = [
+        {'foo': 1},
+        {'Fs': 0},
+        {'Fs': 8000, 'Tsym': 0.0011},
+        {'Fs': 44100, 'Tsym': 1 / 105, 'frequencies': [1050, 2100]},
+        {'Tsym': '0.001'},
+        {'gain': None},
+        {'Fs': 8000, 'frequencies': [1000, 5000]},
+        {'Fs': 8000, 'frequencies': [1000, 2000, 3000]},
+        {'Fs': 8000, 'carriers': [1500, 2500]},
+        {'Fs': 8000, 'carriers': [1000, 1000, 2000]},
+        {'Fs': 8000, 'carriers': [1000], 'frequencies': [1000, 2000]},
+        {'Npoints': 12},
+        {'Npoints': [16, 16]},
+        {'gain': 1.5},
+        {'prefix_length': 20},
+        {'training_length': 100.0},
+        {'silence_length': 0},
+        {'Fs': 8000, 'carriers': [1000], 'pilot': True},
+        {'Fs': 8000, 'guard_length': 8},
+        {'guard_length': -1},
+        {'pilot_interval': 0},
+        {'pilot_interval': 2.5},
+        {'guard_length': 1.5},
+    ]
+    for profile in invalid:
+        with pytest.raises(ValueError):
+            config.validate(profile)
+
+
+def test_load(tmp_path):
+    fname = tmp_path / 'profile.json'
+    fname.write_text('{"Fs": 16000, "Npoints": [4, 16], '
+                     '"frequencies": [2000, 3000]}')
+    c = config.load(str(fname))
+    assert c.modem_bps == 6000
+    assert config.load(str(fname)) is c  # cached
+
+    if config.toml is None:
+        pytest.skip('TOML is not supported')
+    fname = tmp_path / 'profile.toml'
+    fname.write_text('Fs = 8000\nTsym = 0.002\nNpoints = 4\n'
+                     'carriers = [1000, 2000, 3500]\n')
+    c = config.load(str(fname))
+    assert c.modem_bps == 3000
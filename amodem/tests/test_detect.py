@@ -1,22 +1,29 @@
 import numpy as np
 import pytest
 
-from .. import common, config, detect, dsp, equalizer, recv, sampling
+from .. import common, detect, dsp, equalizer, recv, sampling
+from .. import config as _config
 
-config = config.fastest()
+config = _config.fastest()
 
 
-def test_detect():
-    P = sum(equalizer.prefix)
-    t = np.arange(P * config.Nsym) * config.Ts
-    x = np.cos(2 * np.pi * config.Fc * t)
+@pytest.mark.parametrize('prefix_length', [200, 40])
+def test_detect(prefix_length):
+    cfg = _config.Configuration(Fs=config.Fs, frequencies=config.frequencies,
+                                prefix_length=prefix_length)
+    t = np.arange(prefix_length * cfg.Nsym) * cfg.Ts
+    x = np.cos(2 * np.pi * cfg.Fc * t)
+    silence = np.zeros(cfg.silence_length * cfg.Nsym)
+    x = np.concatenate([silence, x, silence])
 
-    detector = detect.Detector(config, pylab=common.Dummy())
-    _samples, amp, freq_err = detector.run(x)
+    detector = detect.Detector(cfg, pylab=common.Dummy())
+    assert detector.carrier_duration == prefix_length
+    assert detector.start_pattern_length >= 1
+    _samples, amp, freq_err = detector.run(iter(x))
     assert abs(1 - amp) < 1e-12
     assert abs(freq_err) < 1e-12
 
-    x = np.cos(2 * np.pi * (2*config.Fc) * t)
+    x = np.cos(2 * np.pi * (2*cfg.Fc) * t)
     with pytest.raises(ValueError):
         detector.run(x)
 
@@ -25,10 +32,23 @@ def test_detect():
         detector.run(x)
 
 
+def test_default_constants():
+    default = _config.Configuration()
+    detector = detect.Detector(default, pylab=common.Dummy())
+    assert detect.Detector.CARRIER_DURATION == detector.carrier_duration
+    assert detect.Detector.CARRIER_THRESHOLD == detector.carrier_threshold
+    assert detect.Detector.SEARCH_WINDOW == detector.search_window
+    assert (detect.Detector.START_PATTERN_LENGTH ==
+            detector.start_pattern_length)
+    assert equalizer.prefix == default.prefix
+    assert equalizer.equalizer_length == default.training_length
+    assert equalizer.silence_length == default.silence_length
+
+
 def test_prefix():
     omega = 2 * np.pi * config.Fc / config.Fs
     symbol = np.cos(omega * np.arange(config.Nsym))
-    signal = np.concatenate([c * symbol for c in equalizer.prefix])
+    signal = np.concatenate([c * symbol for c in config.prefix])
 
     def symbols_stream(signal):
         sampler = sampling.Sampler(signal)
@@ -6,6 +6,7 @@ import numpy as np
 from .. import dsp, sampling, config
 from . import utils
 
+wide = config.fastest(Fs=96e3)  # using FFT demux (see dsp.fft_bins)
 config = config.fastest()
 
 
@@ -39,6 +40,51 @@ def test_demux():
     assert np.max(np.abs(res - syms)) < 1e-12
 
 
+def test_fft_bins():
+    omegas = 2 * np.pi * np.array(wide.frequencies) / wide.Fs
+    bins = dsp.fft_bins(omegas, wide.Nsym)
+    assert list(bins) == list(np.array(wide.frequencies) * wide.Tsym)
+    assert dsp.fft_bins(omegas + 1e-3, wide.Nsym) is None  # off-grid
+    assert dsp.fft_bins(omegas[:2], wide.Nsym) is None  # correlate
+
+
+def test_demux_fft():
+    omegas = 2 * np.pi * np.array(wide.frequencies) / wide.Fs
+    x = np.random.RandomState(0).normal(size=10 * wide.Nsym)
+    fft = dsp.Demux(sampling.Sampler(x), omegas, wide.Nsym)
+    correlator = dsp.Demux(sampling.Sampler(x), omegas, wide.Nsym,
+                           filters=dsp.demux_filters(omegas, wide.Nsym))
+    correlator.bins = None
+    assert fft.bins is not None
+    expected = np.array(list(correlator))
+    assert np.max(np.abs(np.array(list(fft)) - expected)) < 1e-12
+
+
+def test_demux_block():
+    omegas = 2 * np.pi * np.array(wide.frequencies) / wide.Fs
+    x = np.random.RandomState(0).normal(size=10 * wide.Nsym)
+    expected = np.array(list(dsp.Demux(sampling.Sampler(x), omegas,
+                                       wide.Nsym)))
+    for carriers in [omegas, omegas[:2]]:  # using FFT, and correlation
+        symbols = dsp.demux_block(x, carriers, wide.Nsym)
+        assert symbols.shape == (10, len(carriers))
+        assert np.max(np.abs(symbols - expected[:, :len(carriers)])) < 1e-12
+
+
+def test_modulator():
+    omegas = 2 * np.pi * np.array(wide.frequencies) / wide.Fs
+    symbols = np.random.RandomState(0).normal(size=(10, len(omegas), 2))
+    symbols = symbols.view(complex)[..., 0]
+    modulate = dsp.Modulator(omegas, wide.Nsym, gain=0.5)
+    assert modulate.bins is not None
+    expected = np.dot(symbols, wide.carriers).real * 0.5
+    assert np.max(np.abs(modulate(symbols) - expected)) < 1e-12
+    assert np.max(np.abs(modulate(symbols[0]) - expected[0])) < 1e-12
+
+    modulate.bins, modulate.carriers = None, wide.carriers
+    assert np.max(np.abs(modulate(symbols) - expected)) < 1e-12
+
+
 def test_qam():
     q = dsp.MODEM(config.symbols)
     r = random.Random(0)
@@ -90,3 +136,48 @@ def test_prbs():
     r = list(itertools.islice(dsp.prbs(reg=1, poly=0x1100b, bits=16), period))
     r.sort()
     assert r == list(range(1, 2 ** 16))
+
+
+def test_fir():
+    r = np.random.RandomState(seed=0)
+    h = r.normal(size=10)
+    x = r.normal(size=300)
+    f = dsp.FIR(h)
+    y = [list(f(x[i:j])) for i, j in [(0, 5), (5, 5), (5, 6), (6, 300)]]
+    y = np.concatenate(y)
+    assert np.max(np.abs(y - np.convolve(x, h)[:len(x)])) < 1e-12
+
+
+def test_decode_block():
+    q = dsp.MODEM(config.symbols)
+    r = np.random.RandomState(seed=0)
+    received = r.normal(size=(100, 3)) + 1j * r.normal(size=(100, 3))
+    decoded, bits = q.decode_block(received)
+    assert decoded.shape == received.shape
+    assert bits.shape == received.shape + (q.bits_per_symbol,)
+
+    expected = list(q.decode(received.ravel()))
+    assert [tuple(b) for b in bits.reshape(-1, q.bits_per_symbol)] == expected
+    assert list(q.encode(bits.ravel())) == list(decoded.ravel())
+
+
+def test_llr_block():
+    q = dsp.MODEM(config.symbols)
+    r = np.random.RandomState(seed=0)
+    received = r.normal(size=(100, 3)) + 1j * r.normal(size=(100, 3))
+    noise_var = np.array([0.1, 0.2, 0.4])
+    llrs = q.llr_block(received, noise_var)
+    assert llrs.shape == received.shape + (q.bits_per_symbol,)
+
+    # the hard decisions match the LLRs' signs
+    _, bits = q.decode_block(received)
+    assert np.array_equal(bits, (llrs < 0).astype(int))
+
+    # compare with the max-log definition
+    for index in [(0, 0), (12, 1), (99, 2)]:
+        distances = np.abs(received[index] - q.symbols) ** 2
+        for k in range(q.bits_per_symbol):
+            d0 = min(distances[q.bits_table[:, k] == 0])
+            d1 = min(distances[q.bits_table[:, k] == 1])
+            expected = (d1 - d0) / noise_var[index[1]]
+            assert abs(llrs[index][k] - expected) < 1e-9
@@ -2,9 +2,9 @@ from numpy.random import RandomState
 import numpy as np
 
 from . import utils
-from .. import config, dsp, equalizer
+from .. import config as _config, dsp, equalizer
 
-config = config.fastest()
+config = _config.fastest()
 
 
 def assert_approx(x, y, e=1e-12):
@@ -46,6 +46,18 @@ def test_modem():
     assert_approx(sent, received)
 
 
+def test_modem_guard():
+    L = 100
+    cfg = _config.Configuration(guard_length=8)
+    e = equalizer.Equalizer(cfg)
+    sent = e.train_symbols(L)
+    x = e.modulator(sent) * cfg.Nfreq
+    assert len(x) == L * cfg.symbol_length
+    symbol = x[cfg.symbol_length:2*cfg.symbol_length]
+    assert_approx(symbol[:8], symbol[-8:])  # cyclic prefix
+    assert_approx(sent, e.demodulator(x, L))
+
+
 def test_signal():
     length = 120
     x = np.sign(RandomState(0).normal(size=length))
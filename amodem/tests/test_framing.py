@@ -52,3 +52,30 @@ def test_missing():
         concat(f.decode(b'\x01'))
     with pytest.raises(ValueError):
         concat(f.decode(b'\xff'))
+
+
+def test_frame_decoder(data):
+    encoded = list(framing.encode(data)) + [0] * 100  # trailing bits
+    decoder = framing.FrameDecoder()
+    frames = []
+    offset = 0
+    while offset < len(encoded):
+        size = r.randrange(1, 1000)
+        frames.extend(decoder.feed(encoded[offset:offset+size]))
+        offset += size
+    assert decoder.eof
+    assert concat(frames) == data
+    assert not decoder.feed([0] * 100)
+
+
+def test_fill(data):
+    f = framing.Framer()
+    frames = list(f.encode(data))
+    fill = f.fill()
+    encoded = concat([fill] + [frame + fill * 3 for frame in frames])
+    assert concat(f.decode(encoded)) == data
+
+    decoder = framing.FrameDecoder()
+    bits = framing.to_bits([encoded])
+    assert concat(decoder.feed(bits)) == data
+    assert decoder.eof
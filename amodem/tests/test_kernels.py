@@ -0,0 +1,88 @@
+from io import BytesIO
+import os
+
+import numpy as np
+import pytest
+
+from .. import config, kernels, main, sampling
+
+
+@pytest.fixture(params=sorted(kernels.implementations))
+def impl(request):
+    return request.param
+
+
+@pytest.fixture
+def selected(impl):
+    prev = kernels.backend
+    kernels.select(impl)
+    yield impl
+    kernels.select(prev)
+
+
+def test_interpolate(impl):
+    r = np.random.RandomState(seed=0)
+    filt = sampling.defaultInterpolator.filt
+    buff = r.normal(size=1000)
+    starts = r.randint(0, len(buff) - filt.shape[1], size=100)
+    phases = r.randint(0, len(filt), size=100)
+    y = kernels.implementations[impl]['interpolate'](filt, buff, starts,
+                                                     phases)
+    expected = [np.dot(filt[p], buff[s:s+filt.shape[1]])
+                for s, p in zip(starts, phases)]
+    assert np.max(np.abs(y - expected)) < 1e-12
+
+
+def test_fir(impl):
+    r = np.random.RandomState(seed=0)
+    h = r.normal(size=10)
+    x = r.normal(size=300)
+    y = kernels.implementations[impl]['fir'](h, x)
+    expected = np.convolve(x, h)[len(h)-1:len(x)]
+    assert np.max(np.abs(y - expected)) < 1e-12
+
+
+def test_nearest(impl):
+    r = np.random.RandomState(seed=0)
+    nearest = kernels.implementations[impl]['nearest']
+    symbols = config.bitrates[80].symbols
+    received = r.normal(size=1000) + 1j * r.normal(size=1000)
+    expected = [np.argmin(np.abs(symbols - x)) for x in received]
+    assert list(nearest(symbols, received)) == expected
+    assert [nearest(symbols, x) for x in received[:10]] == expected[:10]
+
+
+def test_solver(impl):
+    r = np.random.RandomState(seed=0)
+    solver = kernels.implementations[impl]['solver']
+    N = 20
+    t = r.normal(size=N)
+    t[0] += N  # make sure the matrix is well-conditioned
+    y = r.normal(size=N)
+    M = np.array([[t[abs(i - j)] for j in range(N)] for i in range(N)])
+    x = solver(t, y)
+    assert np.max(np.abs(np.dot(M, x) - y)) < 1e-12
+
+
+def test_select():
+    prev = kernels.backend
+    try:
+        kernels.select('numpy')
+        assert kernels.backend == 'numpy'
+        assert kernels.fir is kernels.implementations['numpy']['fir']
+        with pytest.raises(ValueError):
+            kernels.select('foo')
+    finally:
+        kernels.select(prev)
+
+
+def test_transfer(selected):
+    cfg = config.bitrates[80]
+    tx_data = os.urandom(1000)
+    tx_audio = BytesIO()
+    main.send(config=cfg, src=BytesIO(tx_data), dst=tx_audio)
+    rx_data = BytesIO()
+    assert main.recv(config=cfg, src=BytesIO(tx_audio.getvalue()),
+                     dst=rx_data)
+    assert rx_data.getvalue() == tx_data
+    assert kernels.backend == selected
@@ -0,0 +1,89 @@
+from io import BytesIO
+import json
+import os
+
+import numpy as np
+
+from .. import common, config, main, probe
+from . import utils
+
+
+def channel(x):
+    r = np.random.RandomState(seed=0)
+    x = utils.lfilter(b=[0.5], a=[1, -0.5], x=x) * 0.3  # lowpass
+    return x + r.normal(size=len(x), scale=0.002)
+
+
+def transmit(cfg, data):
+    tx_audio = BytesIO()
+    main.send(config=cfg, src=BytesIO(data), dst=tx_audio)
+    rx_audio = common.dumps(channel(common.loads(tx_audio.getvalue())))
+    return BytesIO(rx_audio)
+
+
+def test_required_snr():
+    required = [probe.required_snr(config.Configuration(Npoints=n).symbols)
+                for n in (2, 4, 16, 64, 256)]
+    assert required == sorted(required)
+    assert abs(required[1] - 20 * np.log10(probe.margin)) < 1e-12
+
+
+def test_recommend():
+    snr = {f: 100.0 for f in probe.config.frequencies}
+    assert config.bitrates[probe.recommend(snr)] is config.fastest()
+    assert probe.recommend({}) is None
+
+    snr = {f: 20.0 for f in probe.config.frequencies}
+    rate = probe.recommend(snr)
+    assert config.bitrates[rate].Npoints == 4
+
+
+def test_probe():
+    result = main.probe(probe.config, src=transmit(probe.config, b''))
+    assert set(result['snr']) == set(probe.config.frequencies)
+    assert abs(result['drift']) < 1
+
+    rate = probe.report(result)
+    assert rate is not None
+
+    loaded = probe.bit_loading(result['snr'])
+    assert loaded.modem_bps > config.bitrates[rate].modem_bps
+
+    data = os.urandom(1024)
+    for cfg in [config.bitrates[rate], loaded]:
+        rx_data = BytesIO()
+        assert main.recv(cfg, src=transmit(cfg, data), dst=rx_data)
+        assert rx_data.getvalue() == data
+
+
+def test_bit_loading():
+    snr = {f: 100.0 for f in probe.config.frequencies}
+    loaded = probe.bit_loading(snr)
+    assert [len(c) for c in loaded.constellations] == [256] * loaded.Nfreq
+
+    assert probe.bit_loading({}) is None
+
+
+def test_bit_loading_notch():
+    freqs = list(probe.config.frequencies)
+    snr = {f: 25.0 for f in freqs}
+    snr[freqs[3]] = 5.0  # below the BPSK threshold
+    notched = probe.bit_loading(snr)
+    assert list(notched.frequencies) == freqs[:3] + freqs[4:]
+    assert [len(c) for c in notched.constellations] == [16] * (len(freqs) - 1)
+
+    snr = {freqs[0]: 25.0, freqs[2]: 40.0}  # 2 non-adjacent carriers
+    loaded = probe.bit_loading(snr)
+    assert list(loaded.frequencies) == [freqs[0], freqs[2]]
+    assert [len(c) for c in loaded.constellations] == [16, 256]
+    profile = {'Fs': loaded.Fs, 'Tsym': loaded.Tsym,  # as stored by calib
+               'carriers': [float(f) for f in loaded.frequencies],
+               'Npoints': [len(c) for c in loaded.constellations]}
+    profile = config.validate(json.loads(json.dumps(profile)))
+    assert list(profile.frequencies) == list(loaded.frequencies)
+
+    data = os.urandom(100)
+    for cfg in [notched, loaded, profile]:
+        rx_data = BytesIO()
+        assert main.recv(cfg, src=transmit(cfg, data), dst=rx_data)
+        assert rx_data.getvalue() == data
@@ -23,3 +23,14 @@ def test_coeffs():
     interp = sampling.Interpolator(width=4, resolution=16)
     err = interp.filt[0] - [0, 0, 0, 1, 0, 0, 0, 0]
     assert np.max(np.abs(err)) < 1e-10
+
+
+def test_chunks():
+    x = np.random.RandomState(seed=0).normal(size=10000)
+    s1 = sampling.Sampler(x, sampling.Interpolator(), freq=1.001)
+    y1 = s1.take(len(x))
+    s2 = sampling.Sampler(x, sampling.Interpolator(), freq=1.001)
+    y2 = np.concatenate([s2.take(n) for n in [1, 31, 3000, len(x)]])
+    assert len(y1) == len(y2) < len(x)
+    assert np.max(np.abs(y1 - y2)) < 1e-12
+    assert len(s2.take(1)) == 0
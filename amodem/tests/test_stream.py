@@ -1,5 +1,7 @@
+import os
 import subprocess as sp
 import sys
+import time
 
 from .. import stream
 
@@ -34,3 +36,22 @@ def test_read():
         next(f)
     except IOError as e:
         assert e.args == ('timeout',)
+
+
+def test_feed():
+    rfd, wfd = os.pipe()
+    with open(rfd, 'rb') as src, open(wfd, 'wb', buffering=0) as dst:
+        f = stream.Feed(src)
+        assert f.read(timeout=0.1) == b''  # idle
+        dst.write(b'abc')
+        assert f.read(timeout=1) == b'abc'  # without waiting for more
+        dst.write(b'12345')
+        time.sleep(0.1)
+        dst.write(b'678')
+        time.sleep(0.1)
+        assert f.read(timeout=1) == b'12345678'
+        assert not f.eof
+        dst.close()
+        assert f.read(timeout=1) == b''
+        assert f.eof
+        assert f.total == 11
@@ -1,18 +1,21 @@
 from io import BytesIO
 import logging
 import os
+import threading
+import time
 
 import numpy as np
 import pytest
 
-from .. import common, config, main, sampling
+from .. import channel, common, config, equalizer, framing
+from .. import main, sampling, send
 from . import utils
 
 logging.basicConfig(level=logging.DEBUG,  # useful for debugging
                     format='%(asctime)s %(levelname)-12s %(message)s')
 
 
-def run(size, chan=None, df=0, success=True, cfg=None):
+def run(size, chan=None, df=0, success=True, cfg=None, **kwargs):
     if cfg is None:
         cfg = config.fastest()
     tx_data = os.urandom(size)
@@ -35,7 +38,7 @@ def run(size, chan=None, df=0, success=True, cfg=None):
 
     try:
         result = main.recv(config=cfg, src=rx_audio, dst=rx_data,
-                           dump_audio=dump, pylab=None)
+                           dump_audio=dump, pylab=None, **kwargs)
     finally:
         rx_audio.close()
 
@@ -107,6 +110,35 @@ def test_medium_noise():
     run(5120, chan=lambda x: x + r.normal(size=len(x), scale=0.001))
 
 
+def test_channel():
+    chan = channel.Channel(
+        channel.Multipath([1.0, 0.0, 0.2]),
+        channel.Gain(0.8, steps=[(100000, 0.7)]),
+        channel.Drift(ppm=50),
+        channel.Noise(snr=40, power=0.01, seed=0),
+        channel.Clip(1.0))
+    run(5120, chan=chan.apply, cfg=config.bitrates[48])
+
+
+@pytest.mark.parametrize('ppm', [-300, 500])
+@pytest.mark.parametrize('interval', [1, 10, 40])
+def test_pilot(ppm, interval):
+    cfg = config.bitrates[48].replace(pilot=True, pilot_interval=interval)
+    assert cfg.modem_bps == 42000
+    chan = channel.Channel(channel.Drift(ppm=ppm),
+                           channel.Noise(snr=40, power=0.01, seed=0))
+    run(5120, chan=chan.apply, cfg=cfg)
+
+
+def test_guard():
+    cfg = config.bitrates[64].replace(guard_length=16)  # 256-QAM
+    assert cfg.modem_bps == 64000 * 32 // 48
+    chan = channel.Channel(channel.Multipath([1.0] + [0.0] * 7 + [0.5]),
+                           channel.Drift(ppm=20),
+                           channel.Noise(snr=50, power=0.01, seed=0))
+    run(5120, chan=chan.apply, cfg=cfg)
+
+
 def test_large():
     run(54321, chan=lambda x: x)
 
@@ -118,3 +150,178 @@ def rate(request):
 
 def test_rate(rate):
     run(1, cfg=config.bitrates[rate])
+
+
+def test_bit_loading():
+    cfg = config.Configuration(Npoints=[256, 64, 2, 16, 4, 8, 32, 128],
+                               frequencies=[2e3, 9e3])
+    run(1024, cfg=cfg)
+
+
+def test_explicit_carriers():
+    cfg = config.Configuration(Fs=48e3, Npoints=64,
+                               frequencies=[2e3, 5e3, 6e3, 12e3, 20e3])
+    run(1024, cfg=cfg)
+
+
+def test_pipeline(small_size):
+    run(small_size, pipeline=True)
+    run(54321, pipeline=True)
+
+
+def test_pipeline_timing(freq_err):
+    run(8192, df=freq_err, pipeline=True)
+
+
+def test_pipeline_error():
+    skip = 32000  # remove trailing silence
+    run(1024, chan=lambda x: x[:-skip], success=False,
+        cfg=config.bitrates[80], pipeline=True)
+
+
+def test_recv_iter():
+    cfg = config.bitrates[80]
+    tx_data = os.urandom(50000)
+    tx_audio = BytesIO()
+    main.send(config=cfg, src=BytesIO(tx_data), dst=tx_audio)
+    rx_audio = BytesIO(tx_audio.getvalue())
+
+    chunks = main.recv_iter(config=cfg, src=rx_audio)
+    data, stats = next(chunks)
+    assert rx_audio.tell() < len(tx_audio.getvalue()) / 2  # low latency
+    assert stats['offset'] == 0
+    assert stats['snr'] > 30
+    assert abs(stats['drift']) < 1
+    assert stats['time'] > 0
+
+    offset = len(data)
+    for chunk, stats in chunks:
+        assert stats['offset'] == offset
+        data += chunk
+        offset += len(chunk)
+    assert data == tx_data
+
+
+def test_session():
+    session = main.Session(config.bitrates[80])
+    for size in [0, 100, 1000, 100]:
+        tx_data = os.urandom(size)
+        tx_audio = BytesIO()
+        assert session.send(src=BytesIO(tx_data), dst=tx_audio)
+
+        rx_data = BytesIO()
+        assert session.recv(src=BytesIO(tx_audio.getvalue()), dst=rx_data)
+        assert rx_data.getvalue() == tx_data
+        assert session.receiver.output_size == size
+
+        expected = BytesIO()
+        main.send(config.bitrates[80], src=BytesIO(tx_data), dst=expected)
+        assert tx_audio.getvalue() == expected.getvalue()
+
+
+@pytest.mark.parametrize('lengths', [(40, 50, 5), (100, 100, 20)])
+def test_short_preamble(lengths):
+    prefix, training, silence = lengths
+    cfg = config.Configuration(Fs=8e3, Npoints=16, frequencies=[1e3, 2e3],
+                               prefix_length=prefix, training_length=training,
+                               silence_length=silence, silence_start=0.1,
+                               skip_start=0.05)
+    run(1000, cfg=cfg)
+    run(1000, cfg=cfg, chan=lambda x: x * 0.5, df=10e-6)
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_recv_soft(pipeline):
+    cfg = config.bitrates[80]
+    tx_data = os.urandom(5000)
+    tx_audio = BytesIO()
+    main.send(cfg, src=BytesIO(tx_data), dst=tx_audio, gain=0.5)
+    chan = channel.Channel(channel.Noise(snr=28, power=0.01, seed=0))
+    rx_audio = common.dumps(chan.apply(common.loads(tx_audio.getvalue())))
+
+    tx_bits = np.array(list(framing.encode(tx_data)))
+    session = main.Session(cfg, pipeline=pipeline)
+    llrs = []
+    for block in session.recv_soft(src=BytesIO(rx_audio)):
+        llrs.extend(block)
+        if len(llrs) >= len(tx_bits):
+            break
+    llrs = np.array(llrs[:len(tx_bits)])
+    errors = (llrs < 0) != tx_bits
+    assert 0 < np.mean(errors) < 1e-2  # a few hard decision errors
+    # ... which are less reliable than the correct decisions
+    assert np.mean(np.abs(llrs[errors])) < np.mean(np.abs(llrs)) / 10
+
+
+def test_streaming():
+    cfg = config.bitrates[80]
+    chunks = [os.urandom(size) for size in (10, 300, 1)]
+    rfd, wfd = os.pipe()
+
+    def feed():
+        with open(wfd, 'wb', buffering=0) as f:
+            for chunk in chunks:
+                f.write(chunk)
+                time.sleep(0.3)  # the source is idle
+
+    thread = threading.Thread(target=feed)
+    thread.start()
+    tx_audio = BytesIO()
+    with open(rfd, 'rb') as src:
+        assert main.send(cfg, src=src, dst=tx_audio, streaming=True)
+    thread.join()
+    tx_audio = tx_audio.getvalue()
+    empty = BytesIO()
+    main.send(cfg, src=BytesIO(), dst=empty)
+    idle_time = (len(tx_audio) - len(empty.getvalue())) / cfg.sample_size
+    assert idle_time / cfg.Fs > 0.5  # the carrier was kept up
+
+    frames = [data for data, _ in main.recv_iter(cfg, src=BytesIO(tx_audio))]
+    assert frames == [chunks[0], chunks[1][:250], chunks[1][250:], chunks[2]]
+
+
+def test_streaming_idle():
+    cfg = config.bitrates[80]
+    rfd, wfd = os.pipe()
+    thread = threading.Thread(target=lambda: (time.sleep(1), os.close(wfd)))
+    tx_audio = BytesIO()
+    start = time.time()
+    thread.start()
+    with open(rfd, 'rb') as src:
+        assert main.send(cfg, src=src, dst=tx_audio, streaming=True)
+    elapsed = time.time() - start
+    thread.join()
+    empty = BytesIO()
+    main.send(cfg, src=BytesIO(), dst=empty)
+    idle_time = (len(tx_audio.getvalue()) - len(empty.getvalue()))
+    idle_time = idle_time / cfg.sample_size / cfg.Fs
+    # the idle frames are paced by the sample clock (keeping the latency low)
+    assert elapsed - 2 * cfg.latency < idle_time < elapsed + 2 * cfg.latency
+
+
+def test_sender_flush():
+    cfg = config.bitrates[80]
+    size = int(cfg.latency * cfg.Fs)
+    fd = BytesIO()
+    with send.Sender(fd, config=cfg) as sender:
+        sender.write(np.zeros(size + 3))
+        assert len(fd.getvalue()) == size * cfg.sample_size  # buffer is full
+    assert len(fd.getvalue()) == (size + 3) * cfg.sample_size
+
+
+def test_preamble():
+    cfg = config.bitrates[80]
+    gain = 0.5
+    sender = send.Sender(BytesIO(), config=cfg, gain=gain)
+    sender.start()
+    assert sender.offset * cfg.sample_size == len(sender.fd.getvalue())
+
+    # compare with symbol-by-symbol rendering
+    pilot = cfg.carriers[cfg.carrier_index]
+    silence = np.zeros(cfg.silence_length * cfg.Nsym)
+    training = equalizer.Equalizer(cfg).train_signal(cfg.training_length)
+    parts = [pilot * value for value in cfg.prefix]
+    parts += [silence, training, silence]
+    expected = b''.join(common.dumps(np.array(p) * gain) for p in parts)
+    assert sender.fd.getvalue() == expected
+    assert send.preamble(cfg, gain) is send.preamble(cfg, gain)  # cached
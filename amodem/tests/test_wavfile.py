@@ -0,0 +1,123 @@
+from io import BytesIO
+import os
+import wave
+
+import pytest
+
+from .. import config as _config, main, wavfile
+
+config = _config.bitrates[80]
+
+
+class NonSeekable(BytesIO):
+    def seekable(self):
+        return False
+
+
+def test_roundtrip():
+    data = os.urandom(1000)
+    fd = BytesIO()
+    w = wavfile.Writer(fd, config)
+    w.write(data)
+    fd.close = lambda: None
+    w.close()
+
+    r = wave.open(BytesIO(fd.getvalue()))
+    assert r.getframerate() == config.Fs
+    assert r.getnchannels() == 1
+    assert r.getsampwidth() == 2
+    assert r.readframes(r.getnframes()) == data
+
+    r = wavfile.Reader(BytesIO(fd.getvalue() + b'trailing'), config)
+    assert r.config is config
+    assert r.read(100) + r.read(10000) == data
+    assert r.read(100) == b''
+
+
+def test_streaming():
+    data = os.urandom(1000)
+    fd = NonSeekable()
+    w = wavfile.Writer(fd, config)
+    w.write(data)
+    fd.close = lambda: None
+    w.close()
+
+    r = wavfile.Reader(BytesIO(fd.getvalue()), _config.slowest())
+    assert r.config is config  # selected using the stored profile
+    assert r.read(10000) == data
+
+
+def test_large_file():
+    data = os.urandom(1000)
+    fd = BytesIO()
+    w = wavfile.Writer(fd, config)
+    w.write(data)
+    w.size += 1 << 32  # as if more than 4GB were written
+    fd.close = lambda: None
+    w.close()
+
+    r = wavfile.Reader(BytesIO(fd.getvalue()), config)
+    assert r.left is None  # the sizes are unknown
+    assert r.read(10000) == data
+
+
+def test_stdlib_wave():
+    data = os.urandom(1000)
+    fd = BytesIO()
+    w = wave.open(fd, 'wb')
+    w.setnchannels(1)
+    w.setsampwidth(2)
+    w.setframerate(int(config.Fs))
+    w.writeframes(data)
+    w.close()
+
+    r = wavfile.Reader(BytesIO(fd.getvalue()), config)
+    assert r.read(10000) == data
+
+    with pytest.raises(ValueError):
+        wavfile.Reader(BytesIO(fd.getvalue()), _config.slowest())
+    with pytest.raises(ValueError):
+        wavfile.Reader(BytesIO(fd.getvalue()[:30]), config)
+    with pytest.raises(ValueError):
+        wavfile.Reader(BytesIO(b'\x00' * 100), config)
+
+
+def test_select_config():
+    assert wavfile.select_config(32000, 1, 2, config) is config
+    slowest = _config.slowest()
+    assert wavfile.select_config(8000, 1, 2, config, bitrate=1) is slowest
+    with pytest.raises(ValueError):
+        wavfile.select_config(32000, 2, 2, config)
+    with pytest.raises(ValueError):
+        wavfile.select_config(32000, 1, 1, config)
+    with pytest.raises(ValueError):
+        wavfile.select_config(16000, 1, 2, config, bitrate=1)
+
+
+def test_loopback(tmp_path):
+    fname = tmp_path / 'audio.wav'
+    tx_data = os.urandom(1000)
+    dst = wavfile.open_audio(fname, 'wb', config)
+    main.send(config, src=BytesIO(tx_data), dst=dst)
+    dst.close()
+
+    src = wavfile.open_audio(fname, 'rb', _config.slowest())
+    rx_data = BytesIO()
+    assert main.recv(src.config, src=src, dst=rx_data)
+    src.close()
+    assert rx_data.getvalue() == tx_data
+
+    assert wavfile.open_audio(tmp_path / 'audio.raw', 'rb', config) is None
+
+
+def test_flac(tmp_path):
+    pytest.importorskip('soundfile')
+    fname = tmp_path / 'audio.flac'
+    data = os.urandom(1000)
+    w = wavfile.open_audio(fname, 'wb', config)
+    w.write(data)
+    w.close()
+
+    r = wavfile.open_audio(fname, 'rb', config)
+    assert r.read(10000) == data
+    r.close()
@@ -0,0 +1,38 @@
+import threading
+
+import pytest
+
+from .. import workers
+
+
+def test_background():
+    assert list(workers.background(range(100), maxsize=3)) == list(range(100))
+    assert not list(workers.background([], maxsize=1))
+
+
+def test_error():
+    def gen():
+        yield 1
+        raise ValueError('failed')
+
+    items = workers.background(gen(), maxsize=1)
+    assert next(items) == 1
+    with pytest.raises(ValueError):
+        next(items)
+
+
+def test_close():
+    closed = threading.Event()
+
+    def gen():
+        try:
+            while True:
+                yield 0
+        finally:
+            closed.set()
+
+    items = workers.background(gen(), maxsize=2, name='Test')
+    assert next(items) == 0
+    items.close()
+    assert closed.is_set()
+    assert 'Test' not in [t.name for t in threading.enumerate()]
@@ -0,0 +1,203 @@
+"""WAV (and FLAC) audio files support for amodem.
+
+Audio samples are streamed as raw 16-bit mono PCM data, so that the file
+readers and writers can be used instead of raw audio file objects.
+"""
+
+import json
+import logging
+import struct
+
+import numpy as np
+
+from . import config as _config
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+log = logging.getLogger(__name__)
+
+PCM_FORMAT = 1
+UNKNOWN_SIZE = 0xFFFFFFFF  # used when streaming to a non-seekable file
+PROFILE_CHUNK = b'amod'  # stores the MODEM bitrate
+
+
+def _bitrate(config):
+    for rate, cfg in _config.bitrates.items():
+        if cfg is config:
+            return rate
+    return None
+
+
+def select_config(Fs, channels, sample_size, config, bitrate=None):
+    """ Validate audio parameters, selecting the matching configuration. """
+    if channels != 1 or sample_size != config.sample_size:
+        raise ValueError(f'Unsupported audio format: {channels} channels, '
+                         f'{8 * sample_size} bits per sample')
+
+    if bitrate in _config.bitrates and _config.bitrates[bitrate].Fs == Fs:
+        selected = _config.bitrates[bitrate]
+        if selected is not config:
+            log.info('Using %d kb/s profile (stored in audio file)', bitrate)
+        return selected
+
+    if config.Fs != Fs:
+        raise ValueError(f'Audio file sampling rate ({Fs:.0f} Hz) does not '
+                         f'match the configuration ({config.Fs:.0f} Hz)')
+    return config
+
+
+class Reader:
+    """ Read raw audio samples from a WAV file (which may be streamed). """
+
+    def __init__(self, fd, config):
+        self.fd = fd
+        riff, _, wave = struct.unpack('<4sL4s', self._read_exactly(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError('Invalid WAV file header')
+
+        fmt = None
+        bitrate = None
+        while True:
+            chunk_id, size = struct.unpack('<4sL', self._read_exactly(8))
+            if chunk_id == b'data':
+                break
+            data = self._read_exactly(size + (size & 1))[:size]  # padded
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack('<HHLLHH', data[:16])
+            elif chunk_id == PROFILE_CHUNK:
+                bitrate = json.loads(data).get('bitrate')
+
+        if fmt is None:
+            raise ValueError('Missing WAV format chunk')
+        audio_format, channels, Fs, _, _, bits_per_sample = fmt
+        if audio_format != PCM_FORMAT:
+            raise ValueError(f'Unsupported WAV format: {audio_format}')
+
+        self.config = select_config(
+            Fs=Fs, channels=channels, sample_size=bits_per_sample // 8,
+            config=config, bitrate=bitrate)
+        self.left = None if size in (0, UNKNOWN_SIZE) else size
+
+    def _read_exactly(self, size):
+        data = self.fd.read(size)
+        if len(data) < size:
+            raise ValueError('Truncated WAV file')
+        return data
+
+    def read(self, size):
+        if self.left is not None:
+            size = min(size, self.left)
+        data = self.fd.read(size)
+        if self.left is not None:
+            self.left -= len(data)
+        return data
+
+    def close(self):
+        self.fd.close()
+
+
+class Writer:
+    """ Write raw audio samples into a WAV file (which may be streamed). """
+
+    def __init__(self, fd, config):
+        self.fd = fd
+        self.size = 0
+        self.seekable = _seekable(fd)
+
+        profile = b''
+        bitrate = _bitrate(config)
+        if bitrate is not None:
+            profile = json.dumps({'bitrate': bitrate}).encode()
+            profile += b' ' * (len(profile) & 1)  # chunks are 2-byte aligned
+            header = struct.pack('<4sL', PROFILE_CHUNK, len(profile))
+            profile = header + profile
+
+        Fs = int(config.Fs)
+        sample_size = config.sample_size
+        fmt = struct.pack('<HHLLHH', PCM_FORMAT, 1, Fs, Fs * sample_size,
+                          sample_size, config.bits_per_sample)
+        fmt = struct.pack('<4sL', b'fmt ', len(fmt)) + fmt
+        self.header_size = 12 + len(fmt) + len(profile) + 8
+
+        header = struct.pack('<4sL4s', b'RIFF', UNKNOWN_SIZE, b'WAVE')
+        header += fmt + profile + struct.pack('<4sL', b'data', UNKNOWN_SIZE)
+        assert len(header) == self.header_size
+        self.fd.write(header)
+
+    def write(self, data):
+        self.fd.write(data)
+        self.size += len(data)
+
+    def flush(self):
+        self.fd.flush()
+
+    def close(self):
+        riff_size = self.header_size - 8 + self.size
+        # larger (>4GB) files keep the unknown sizes, and are read until EOF
+        if self.seekable and riff_size < UNKNOWN_SIZE:  # update chunk sizes
+            self.fd.seek(4)
+            self.fd.write(struct.pack('<L', riff_size))
+            self.fd.seek(self.header_size - 4)
+            self.fd.write(struct.pack('<L', self.size))
+            self.fd.seek(0, 2)
+        self.fd.close()
+
+
+def _seekable(fd):
+    try:
+        return fd.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+class FlacReader:
+    """ Read raw audio samples from a FLAC file (using `soundfile`). """
+
+    def __init__(self, fname, config):
+        self.file = soundfile.SoundFile(fname)
+        self.config = select_config(
+            Fs=self.file.samplerate, channels=self.file.channels,
+            sample_size=config.sample_size, config=config)
+
+    def read(self, size):
+        samples = self.file.read(size // self.config.sample_size,
+                                 dtype='int16')
+        return samples.tobytes()
+
+    def close(self):
+        self.file.close()
+
+
+class FlacWriter:
+    """ Write raw audio samples into a FLAC file (using `soundfile`). """
+
+    def __init__(self, fname, config):
+        self.file = soundfile.SoundFile(
+            fname, 'w', samplerate=int(config.Fs), channels=1,
+            subtype='PCM_16', format='FLAC')
+
+    def write(self, data):
+        self.file.write(np.frombuffer(bytes(data), dtype='int16'))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def open_audio(fname, mode, config, bufsize=1 << 20):
+    """ Open an audio file by its extension (or None for raw audio). """
+    fname = str(fname)
+    if fname.endswith('.wav'):
+        fd = open(fname, mode, buffering=bufsize)
+        return Reader(fd, config) if 'r' in mode else Writer(fd, config)
+    if fname.endswith('.flac'):
+        if soundfile is None:
+            raise ValueError('FLAC files require the soundfile package')
+        cls = FlacReader if 'r' in mode else FlacWriter
+        return cls(fname, config)
+    return None
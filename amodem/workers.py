@@ -0,0 +1,57 @@
+"""Background workers for pipelined processing in amodem."""
+
+import logging
+import queue
+import threading
+
+log = logging.getLogger(__name__)
+
+
+def background(iterable, maxsize, name=None, timeout=0.1):
+    """ Iterate over `iterable` using a separate thread.
+    Its items are passed via a bounded queue, so the worker thread may run
+    ahead of the caller by at most `maxsize` items. Exceptions raised by
+    the worker are re-raised by the caller, and closing the returned
+    generator stops the worker thread.
+    """
+    items = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def _put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=timeout)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _worker():
+        log.debug('%s thread started', name)
+        try:
+            for item in iterable:
+                if not _put((item, None)):
+                    break
+            else:
+                _put((None, StopIteration()))
+        except BaseException as e:  # pylint: disable=broad-except
+            _put((None, e))
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+        log.debug('%s thread stopped', name)
+
+    thread = threading.Thread(target=_worker, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if isinstance(error, StopIteration):
+                return
+            if error is not None:
+                raise error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
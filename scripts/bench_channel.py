@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""Script that measures the bit error rate and the goodput of each MODEM
+profile vs. SNR, using a simulated channel (with multipath and drift).
+Unlike `amodem bench-ber`, the raw bit error rate is measured (using the
+same channel simulation as `amodem.bench`).
+
+The bit error rate is measured before the frames' checksums, and the
+goodput counts only the correctly received frames. Reverberant channels
+can be simulated using longer echo delays, and compared with the profiles'
+cyclic prefix variants (using `--guard`).
+"""
+
+import argparse
+import itertools
+import logging
+import os
+
+import numpy as np
+
+from amodem import bench, channel, common, config, detect, framing, main, recv
+
+
+def demodulate(cfg, signal, size):
+    """ Return the first `size` received bits (or less, on failure). """
+    pylab = common.Dummy()
+    try:
+        samples = iter(signal[int(cfg.skip_start * cfg.Fs):])
+        detector = detect.Detector(config=cfg, pylab=pylab)
+        sampler, gain = main.compensate(*detector.run(samples))
+        receiver = recv.Receiver(cfg, pylab=pylab)
+        symbols = receiver.start(sampler, gain=gain)
+        bits = itertools.chain.from_iterable(
+            receiver.bitstream(sampler, symbols))
+        return np.fromiter(itertools.islice(bits, size), dtype=int)
+    except (ValueError, AssertionError):  # not detected (or trained)
+        return np.zeros(0, dtype=int)
+
+
+def received(bits):
+    """ Return the number of correctly received payload bytes. """
+    total = 0
+    try:
+        for frame in framing.decode_frames(bits):
+            total += len(frame)
+    except ValueError:
+        pass
+    return total
+
+
+def measure(cfg, size, snr, ppm, echo, delay, seed):
+    tx_data = os.urandom(size)
+    tx_bits = np.array(list(framing.encode(tx_data)))
+    session = main.Session(cfg, gain=0.5)
+    impairments = [
+        channel.Multipath([1.0] + [0.0] * (delay - 1) + [echo]),
+        channel.Drift(ppm=ppm)]
+    signal, rx_audio = bench.transmit(session, tx_data, snr, seed,
+                                      impairments)
+    rx_bits = demodulate(cfg, common.loads(rx_audio.getvalue()),
+                         len(tx_bits))
+
+    errors = np.sum(rx_bits != tx_bits[:len(rx_bits)])
+    errors += len(tx_bits) - len(rx_bits)  # missing bits are errors
+    duration = len(signal) / cfg.Fs
+    return errors / len(tx_bits), received(rx_bits) / duration
+
+
+def main_():
+    p = argparse.ArgumentParser()
+    p.add_argument('-b', '--bitrates', type=int, nargs='+',
+                   default=sorted(config.bitrates))
+    p.add_argument('--snr', type=float, nargs='+',
+                   default=[10, 15, 20, 25, 30, 35, 40])
+    p.add_argument('-s', '--size', type=int, default=2000,
+                   help='payload size (in bytes)')
+    p.add_argument('--ppm', type=float, default=20.0,
+                   help='sampling clock drift')
+    p.add_argument('--echo', type=float, default=0.1,
+                   help='multipath echo gain')
+    p.add_argument('--delay', type=int, default=2,
+                   help='multipath echo delay (in samples)')
+    p.add_argument('--guard', type=int, nargs='+', default=[0],
+                   help='cyclic prefix lengths (in samples)')
+    p.add_argument('--seed', type=int, default=0)
+    args = p.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)  # failures are expected
+
+    print('kb/s guard   SNR[dB]      BER  goodput[kB/s]')
+    for rate, guard in itertools.product(args.bitrates, args.guard):
+        cfg = config.bitrates[rate].replace(guard_length=guard)
+        for snr in args.snr:
+            ber, goodput = measure(cfg, args.size, snr, args.ppm,
+                                   args.echo, args.delay, args.seed)
+            print(f'{rate:4d} {guard:5d} {snr:9.1f} {ber:8.2e} '
+                  f'{goodput / 1e3:14.3f}')
+
+
+if __name__ == '__main__':
+    main_()
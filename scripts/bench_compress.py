@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+"""Script that measures the effective payload throughput
+of each compression codec, for every MODEM bitrate.
+
+"""
+
+import argparse
+import time
+from io import BytesIO
+
+from amodem import compress, config, framing
+
+
+def measure(data, codec, level):
+    c = compress.Compressor(BytesIO(data), codec=codec, level=level)
+    size = 0
+    t0 = time.time()
+    while True:
+        buf = c.read(framing.Framer.block_size)
+        if not buf:
+            break
+        size += len(buf)
+    return size, time.time() - t0
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('filename')
+    p.add_argument('--levels', type=int, nargs='*', default=[None])
+    args = p.parse_args()
+
+    with open(args.filename, 'rb') as f:
+        data = f.read()
+
+    framer = framing.Framer()
+    overhead = framer.prefix_len + framer.checksum.size
+    efficiency = framer.block_size / (framer.block_size + overhead)
+
+    rates = sorted(config.bitrates)
+    print('codec      level  ratio    MB/s ' +
+          ' '.join(f'{r:>6d}' for r in rates))
+    for name in sorted(compress.codecs):
+        for level in args.levels:
+            size, duration = measure(data, name, level)
+            ratio = len(data) / max(size, 1)
+            speed = len(data) / max(duration, 1e-9) / 1e6
+            # effective payload throughput [kbps] for each MODEM bitrate
+            goodput = [r * efficiency * ratio for r in rates]
+            print(f'{name:10s} {str(level):5s} {ratio:6.2f} {speed:7.2f} ' +
+                  ' '.join(f'{g:6.1f}' for g in goodput))
+
+
+if __name__ == '__main__':
+    main()
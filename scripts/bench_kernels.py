@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+"""Script that measures the speed of each kernel implementation,
+reporting the speedup relative to the NumPy kernels.
+"""
+
+import argparse
+import functools
+import timeit
+
+import numpy as np
+
+from amodem import config, kernels, sampling
+
+
+def workloads(cfg):
+    r = np.random.RandomState(seed=0)
+    filt = sampling.defaultInterpolator.filt
+    Nsym = cfg.Nsym
+    buff = r.normal(size=Nsym + filt.shape[1])
+    starts = np.arange(Nsym)
+    phases = r.randint(0, len(filt), size=Nsym)
+    h = r.normal(size=20)
+    x = r.normal(size=Nsym + len(h) - 1)
+    received = r.normal(size=cfg.Nfreq) + 1j * r.normal(size=cfg.Nfreq)
+    t = r.normal(size=20)
+    t[0] += len(t)
+    y = r.normal(size=len(t))
+
+    # each workload processes a single symbol (except for the solver)
+    return {
+        'interpolate': lambda k: k['interpolate'](filt, buff, starts, phases),
+        'fir': lambda k: k['fir'](h, x),
+        'nearest': lambda k: [k['nearest'](cfg.symbols, v) for v in received],
+        'solver': lambda k: k['solver'](t, y),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('-b', '--bitrate', type=int, default=80)
+    p.add_argument('-n', '--number', type=int, default=100)
+    args = p.parse_args()
+    cfg = config.bitrates[args.bitrate]
+
+    print('kernel       ' + ''.join(f'{name:>12s}' for name in
+                                    sorted(kernels.implementations)) +
+          '     speedup')
+    for name, func in workloads(cfg).items():
+        times = {}
+        for impl_name, impl in sorted(kernels.implementations.items()):
+            func(impl)  # warm-up (and JIT compilation)
+            t = timeit.timeit(functools.partial(func, impl),
+                              number=args.number)
+            times[impl_name] = 1e6 * t / args.number
+        speedup = times['numpy'] / min(times.values())
+        print(f'{name:13s}' + ''.join(f'{times[k]:10.1f}us'
+                                      for k in sorted(times)) +
+              f'{speedup:11.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+"""Script that sends short messages using various preamble settings,
+reporting the end-to-end latency and the decoding reliability of each
+setting over a noisy (and drifting) loopback channel.
+
+The latency is the duration of the transmitted audio (from the start of
+the leading silence until the end of the trailing silence), and the time
+spent by the receiver decoding it.
+"""
+
+import argparse
+import logging
+import os
+import time
+from io import BytesIO
+
+import numpy as np
+
+from amodem import common, config, main, sampling
+
+# (prefix_length, training_length, silence_length) [symbols],
+# and (silence_start, silence_stop) [seconds]
+settings = {
+    'default': (200, 200, 50, 0.5, 0.5),
+    'short': (100, 100, 20, 0.2, 0.2),
+    'shorter': (50, 50, 10, 0.15, 0.1),
+    'shortest': (40, 50, 5, 0.1, 0.05),
+}
+
+
+def configure(base, prefix, training, silence, start, stop):
+    return base.replace(
+        prefix_length=prefix, training_length=training,
+        silence_length=silence, silence_start=start, silence_stop=stop,
+        skip_start=min(base.skip_start, start))
+
+
+def channel(signal, r, Fs, noise, drift):
+    """ Delay the signal randomly, and add sampling drift and noise.
+    The receiver keeps recording after the transmission has ended. """
+    delay = np.zeros(r.randint(0, int(0.1 * Fs)))
+    signal = np.concatenate([delay, signal])
+    sampler = sampling.Sampler(signal, sampling.Interpolator())
+    sampler.freq += r.uniform(-drift, drift) * 1e-6
+    signal = sampler.take(len(signal))
+    signal = np.concatenate([signal, np.zeros(int(Fs))])
+    return signal + r.normal(scale=noise, size=len(signal))
+
+
+def transfer(cfg, size, r, noise, drift):
+    tx_data = os.urandom(size)
+    tx_audio = BytesIO()
+    main.send(config=cfg, src=BytesIO(tx_data), dst=tx_audio, gain=0.5)
+    signal = common.loads(tx_audio.getvalue())
+    audio_time = len(signal) / cfg.Fs
+    rx_audio = common.dumps(channel(signal, r, cfg.Fs, noise, drift))
+
+    rx_data = BytesIO()
+    t0 = time.time()
+    success = main.recv(config=cfg, src=BytesIO(rx_audio), dst=rx_data)
+    decode_time = time.time() - t0
+    success = success and (rx_data.getvalue() == tx_data)
+    return success, audio_time, decode_time
+
+
+def main_():
+    p = argparse.ArgumentParser()
+    p.add_argument('-b', '--bitrate', type=int, default=8)
+    p.add_argument('-n', '--count', type=int, default=20)
+    p.add_argument('-s', '--size', type=int, default=200,
+                   help='message size (in bytes)')
+    p.add_argument('--noise', type=float, default=0.003,
+                   help='additive noise RMS (relative to full scale)')
+    p.add_argument('--drift', type=float, default=20.0,
+                   help='maximal sampling drift [ppm]')
+    p.add_argument('--seed', type=int, default=0)
+    args = p.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)  # failures are expected
+    base = config.bitrates[args.bitrate]
+
+    print('setting    audio[s] decode[s] latency[s]  ok[%]')
+    for name, params in settings.items():
+        cfg = configure(base, *params)
+        r = np.random.RandomState(args.seed)
+        results = [transfer(cfg, args.size, r, args.noise, args.drift)
+                   for _ in range(args.count)]
+        ok, audio_time, decode_time = np.mean(results, axis=0)
+        print(f'{name:10s} {audio_time:8.3f} {decode_time:9.3f} '
+              f'{audio_time + decode_time:10.3f} {100 * ok:6.1f}')
+
+
+if __name__ == '__main__':
+    main_()
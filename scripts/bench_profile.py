@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+"""Script that runs MODEM profiles through the loopback path,
+reporting send/receive speed relative to realtime.
+
+Profiles are specified by bitrate (e.g. 80) or by a JSON/TOML file.
+"""
+
+import argparse
+import os
+import time
+from io import BytesIO
+
+from amodem import common, config, main
+
+
+def loopback(cfg, size, pipeline=False):
+    tx_data = os.urandom(size)
+    tx_audio = BytesIO()
+    t0 = time.time()
+    main.send(config=cfg, src=BytesIO(tx_data), dst=tx_audio)
+    t1 = time.time()
+
+    rx_data = BytesIO()
+    success = main.recv(config=cfg, src=BytesIO(tx_audio.getvalue()),
+                        dst=rx_data, pipeline=pipeline)
+    t2 = time.time()
+
+    audio_time = len(common.loads(tx_audio.getvalue())) / cfg.Fs
+    success = success and (rx_data.getvalue() == tx_data)
+    return success, audio_time, t1 - t0, t2 - t1
+
+
+def main_():
+    p = argparse.ArgumentParser()
+    p.add_argument('profiles', nargs='+')
+    p.add_argument('-s', '--size', type=int, default=10000,
+                   help='payload size (in bytes)')
+    p.add_argument('--pipeline', action='store_true', default=False,
+                   help='demodulate using separate threads')
+    args = p.parse_args()
+
+    print('profile                  kb/s    audio[s] send[%] recv[%]  ok')
+    for name in args.profiles:
+        if os.path.exists(name):
+            cfg = config.load(name)
+        else:
+            cfg = config.bitrates[int(name)]
+        ok, audio_time, tx_time, rx_time = loopback(cfg, args.size,
+                                                    args.pipeline)
+        print(f'{name:20s} {cfg.modem_bps / 1e3:8.1f} {audio_time:10.3f} '
+              f'{100 * tx_time / audio_time:7.1f} '
+              f'{100 * rx_time / audio_time:7.1f}  {ok}')
+
+
+if __name__ == '__main__':
+    main_()
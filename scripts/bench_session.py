@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+"""Script that runs many small consecutive transfers through the loopback
+path, comparing a new setup per transfer with a reused session.
+"""
+
+import argparse
+import os
+import time
+from io import BytesIO
+
+from amodem import config, main
+
+
+def transfers(send, recv, count, size):
+    send_time = recv_time = 0.0
+    for _ in range(count):
+        tx_data = os.urandom(size)
+        tx_audio = BytesIO()
+        t0 = time.time()
+        send(src=BytesIO(tx_data), dst=tx_audio)
+        t1 = time.time()
+
+        rx_data = BytesIO()
+        assert recv(src=BytesIO(tx_audio.getvalue()), dst=rx_data)
+        t2 = time.time()
+        assert rx_data.getvalue() == tx_data
+
+        send_time += t1 - t0
+        recv_time += t2 - t1
+    return send_time, recv_time
+
+
+def main_():
+    p = argparse.ArgumentParser()
+    p.add_argument('-b', '--bitrate', type=int, default=80)
+    p.add_argument('-n', '--count', type=int, default=1000)
+    p.add_argument('-s', '--size', type=int, default=100,
+                   help='payload size (in bytes)')
+    args = p.parse_args()
+    cfg = config.bitrates[args.bitrate]
+
+    session = main.Session(cfg)
+    modes = {
+        'setup': (lambda **kw: main.send(cfg, **kw),
+                  lambda **kw: main.recv(cfg, **kw)),
+        'session': (session.send, session.recv),
+    }
+    print('mode        send[ms] recv[ms]  (per transfer)')
+    for name, (send, recv) in modes.items():
+        send_time, recv_time = transfers(send, recv, args.count, args.size)
+        print(f'{name:10s} {1e3 * send_time / args.count:8.2f} '
+              f'{1e3 * recv_time / args.count:8.2f}')
+
+
+if __name__ == '__main__':
+    main_()